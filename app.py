@@ -1,5 +1,7 @@
 from flask import (
     Flask,
+    Response,
+    jsonify,
     render_template,
     request,
     redirect,
@@ -7,17 +9,26 @@ from flask import (
     flash,
 )
 from flask_wtf.csrf import CSRFProtect
+from werkzeug.datastructures import FileStorage
 from config import config, Config
+import gc
 import os
 import logging
-import io
+import shutil
+import tempfile
 import time
 from whatsapp_statistics import (
-    analyze_messages,
-    parse_chat_stream,
+    METRIC_FAMILIES,
+    AnalysisState,
+    build_analysis_state,
+    configure_spacy,
+    nlp_status,
+    parse_chat_export,
+    warm_up_nlp,
 )
 import json
-from utils import FileValidator, format_file_size
+from jobs import JobError, JobManager, JobQueueFull, JobStore, ProgressReader
+from utils import FileValidator, ResultCache, compute_file_hash, format_file_size
 
 
 # Configure minimal logging - NO file logging for privacy
@@ -70,6 +81,230 @@ file_validator = FileValidator(
     max_size_bytes=app.config.get("MAX_CONTENT_LENGTH", 10 * 1024 * 1024),
 )
 
+# Computed results (never the chats) for repeated submits of the same file
+result_cache = ResultCache(
+    max_entries=app.config.get("RESULT_CACHE_SIZE", 0),
+    ttl_seconds=app.config.get("RESULT_CACHE_TTL", 0),
+)
+
+# Background analyses submitted through the job API, shared between worker
+# processes through JOB_STORE_DIR
+job_store_dir = app.config.get("JOB_STORE_DIR")
+job_manager = JobManager(
+    max_workers=app.config.get("JOB_WORKERS", 2),
+    result_ttl=app.config.get("JOB_RESULT_TTL", 300),
+    max_pending=app.config.get("JOB_MAX_PENDING", 16),
+    store=JobStore(job_store_dir) if job_store_dir else None,
+)
+
+# How the analysis runs spaCy lemmatization
+configure_spacy(
+    n_process=app.config.get("SPACY_N_PROCESS", 1),
+    batch_size=app.config.get("SPACY_BATCH_SIZE", 256),
+    lemma_mode=app.config.get("SPACY_LEMMA_MODE", "pipeline"),
+    pool_size=app.config.get("SPACY_MODEL_POOL_SIZE", 2),
+    pool_timeout=app.config.get("SPACY_MODEL_TIMEOUT", 60),
+)
+
+
+def warm_up():
+    """
+    Load the NLP models now rather than on the first upload.
+
+    Under gunicorn, run it in the master before workers fork (gunicorn.conf.py
+    does it from its on_starting hook) so every worker shares the loaded
+    models copy-on-write.
+    """
+    status = warm_up_nlp()
+    # Keep the cyclic GC from touching (and so un-sharing) the loaded objects
+    gc.freeze()
+    logger.info(f"NLP models loaded: {status}")
+    return status
+
+
+if app.config.get("NLP_PRELOAD"):
+    warm_up()
+
+# Share of a job's overall progress (percent) covered by each stage
+ANALYSIS_STAGES = {
+    "parsing": (0, 30),
+    "analyzing": (30, 95),
+    "finalizing": (95, 100),
+}
+
+# Metric families computed for every upload
+ANALYSIS_METRICS = tuple(METRIC_FAMILIES)
+
+# Seconds between keep-alive comments on an idle event stream
+SSE_KEEPALIVE_SECONDS = 15
+
+# Queued uploads stay in memory up to this size, then spill to a temp file
+UPLOAD_SPOOL_SIZE = 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def _embed_json(data):
+    """Serialize data for a <script type="application/json"> block."""
+    if not data:
+        return "null"
+    return json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
+
+
+def _load_previous_state(state_file):
+    """Read the optional analysis state saved from a previous run."""
+    if state_file is None or not state_file.filename:
+        return None
+    try:
+        data = json.load(state_file.stream)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("the previous analysis state is not valid JSON")
+    return AnalysisState.from_dict(data)
+
+
+def _analysis_cache_key(chat_file, state_file):
+    """
+    Cache key from the uploaded bytes (chat and optional previous state) and
+    the analysis options that change the result.
+    """
+    key = compute_file_hash(chat_file.stream)
+    if state_file is not None and state_file.filename:
+        key += ":" + compute_file_hash(state_file.stream)
+    lemma_mode = app.config.get("SPACY_LEMMA_MODE", "pipeline")
+    return f"{key}|{lemma_mode}|{','.join(ANALYSIS_METRICS)}"
+
+
+def _run_analysis(chat_file, state_file=None, report=None, publish=None):
+    """
+    Parse and analyze an uploaded chat, continuing a previous analysis state
+    if one is given. Stats are served from / stored in the result cache; the
+    analysis state is never cached, so a cached result has no state_json.
+
+    Args:
+        chat_file: Uploaded chat (FileStorage)
+        state_file: Optional uploaded analysis state (FileStorage)
+        report: Optional callback report(stage, fraction) for progress
+        publish: Optional callback publish(stats_json) for partial stats
+            (see _run_streamed_analysis)
+
+    Returns:
+        dict or None: stats_json, state_json ("null" when cached), messages,
+        new_messages (None unless a previous state was continued) and
+        cached; None if the file has no messages
+    """
+    cache_key = None
+    if result_cache.enabled:
+        cache_key = _analysis_cache_key(chat_file, state_file)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached, state_json="null", cached=True)
+
+    # Parse straight from the upload stream, decompressing .zip/.gz
+    # exports and decoding in chunks (UTF-8 with Latin-1 fallback).
+    # Nothing is stored on disk.
+    stream = chat_file.stream
+    if report is not None:
+        stream = ProgressReader(stream, lambda fraction: report("parsing", fraction))
+    messages = parse_chat_export(
+        stream,
+        chat_file.filename,
+        max_bytes=app.config.get("MAX_UNCOMPRESSED_LENGTH"),
+    )
+    if not messages:
+        return None
+
+    # A state downloaded after a previous analysis of the same chat
+    # lets us analyze only the messages added since then.
+    previous_state = _load_previous_state(state_file)
+
+    progress = None
+    if report is not None:
+
+        def report_analysis(fraction):
+            report("analyzing", fraction)
+
+        progress = report_analysis
+
+    new_messages = None
+    if previous_state is not None:
+        new_messages = previous_state.update(messages, progress=progress)
+        analysis_state = previous_state
+    elif publish is not None:
+        analysis_state = _run_streamed_analysis(messages, progress, publish)
+    else:
+        analysis_state = build_analysis_state(
+            messages, metrics=ANALYSIS_METRICS, progress=progress
+        )
+
+    if report is not None:
+        report("finalizing", 0.0)
+    stats = analysis_state.finalize()
+    result = {
+        "stats_json": _embed_json(stats),
+        "messages": stats["total_mensajes"],
+        "new_messages": new_messages,
+    }
+    if cache_key is not None:
+        result_cache.set(cache_key, result)
+    # The state (full vocabulary counts) only goes back to the browser, for
+    # the "save state" download
+    return dict(
+        result, state_json=_embed_json(analysis_state.to_dict()), cached=False
+    )
+
+
+def _run_streamed_analysis(messages, progress, publish):
+    """
+    Analyze every metric family in one pass, publishing the stats of the
+    families that only need dates and senders (activity, conversations,
+    response times) as soon as they are done, before the text metrics.
+    """
+    analysis_state = AnalysisState(ANALYSIS_METRICS)
+
+    def partial(metrics):
+        publish(_embed_json(analysis_state.finalize(metrics)))
+
+    analysis_state.feed(messages, progress=progress, partial=partial)
+    return analysis_state
+
+
+def _buffer_upload(file):
+    """
+    Copy an upload in chunks to a spooled temporary file (in memory up to
+    UPLOAD_SPOOL_SIZE, on disk above it) so a job can read it after the
+    request; the job closes it when it finishes.
+    """
+    if file is None or not file.filename:
+        return None
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+    file.stream.seek(0)
+    shutil.copyfileobj(file.stream, spool, UPLOAD_CHUNK_SIZE)
+    spool.seek(0)
+    return FileStorage(stream=spool, filename=file.filename)
+
+
+def _close_upload(file):
+    if file is not None:
+        file.stream.close()
+
+
+def _analysis_job(job, chat_file, state_file):
+    """Job body for /api/jobs: _run_analysis with progress reporting."""
+
+    def report(stage, fraction):
+        start, end = ANALYSIS_STAGES[stage]
+        job.update(stage, start + (end - start) * fraction)
+
+    try:
+        result = _run_analysis(chat_file, state_file, report, publish=job.publish)
+    except ValueError as ve:
+        raise JobError(f"Invalid file format: {str(ve)}")
+    finally:
+        _close_upload(chat_file)
+        _close_upload(state_file)
+    if result is None:
+        raise JobError("No valid WhatsApp messages found in the file")
+    return result
+
 
 def _merge_csp_sources(defaults, env_key):
     """Combine default CSP sources with optional space-delimited additions."""
@@ -171,7 +406,7 @@ def index():
 def dashboard():
     """Main dashboard"""
     try:
-        analysis_data = None
+        stats_json = state_json = "null"
 
         if request.method == "POST":
             # Check if file is in request
@@ -193,35 +428,33 @@ def dashboard():
             try:
                 start_time = time.time()
 
-                # Read file content (in memory only)
-                raw_bytes = file.stream.read()
-                if not raw_bytes:
+                if not file_size:
                     flash("The file is empty", "error")
                     return redirect(request.url)
 
-                # Decode with fallback encoding
-                try:
-                    text_content = raw_bytes.decode("utf-8")
-                except UnicodeDecodeError:
-                    text_content = raw_bytes.decode("latin-1")
-
-                # Parse and analyze chat (all in memory, no storage)
-                messages = parse_chat_stream(io.StringIO(text_content))
+                result = _run_analysis(file, request.files.get("previousState"))
 
-                if not messages:
+                if result is None:
                     flash("No valid WhatsApp messages found in the file", "warning")
                     return redirect(request.url)
 
-                # Analyze messages
-                stats = analyze_messages(messages)
-                analysis_data = stats
-
+                stats_json, state_json = result["stats_json"], result["state_json"]
                 processing_time = time.time() - start_time
 
                 # Success message emphasizing privacy
-                flash(
-                    f"Analysis completed! Processed {len(messages)} messages in {processing_time:.2f}s. "
-                )
+                if result["cached"]:
+                    flash(
+                        f"Analysis completed! Processed {result['messages']} messages in {processing_time:.2f}s (cached). "
+                    )
+                elif result["new_messages"] is not None:
+                    flash(
+                        f"Analysis updated! Added {result['new_messages']} new messages "
+                        f"({result['messages']} in total) in {processing_time:.2f}s. "
+                    )
+                else:
+                    flash(
+                        f"Analysis completed! Processed {result['messages']} messages in {processing_time:.2f}s. "
+                    )
 
             except ValueError as ve:
                 flash(f"Invalid file format: {str(ve)}", "error")
@@ -233,17 +466,139 @@ def dashboard():
             except Exception as e:
                 flash(f"Error processing the file: {str(e)}", "error")
 
-        stats_json = (
-            json.dumps(analysis_data, ensure_ascii=False) if analysis_data else "null"
+        return render_template(
+            "dashboard.html", stats_json=stats_json, state_json=state_json
         )
 
-        return render_template("dashboard.html", stats_json=stats_json)
-
     except Exception as e:
         flash("An unexpected error occurred. Please try again.", "error")
         return render_template("error.html", error=str(e))
 
 
+@app.route("/ready")
+def ready():
+    """
+    Readiness probe: 503 until the NLP models are loaded when NLP_PRELOAD is
+    on, so a load balancer doesn't send the first uploads to cold workers.
+    """
+    status = nlp_status()
+    is_ready = status["models_loaded"] or not app.config.get("NLP_PRELOAD")
+    return jsonify(dict(status, ready=is_ready)), 200 if is_ready else 503
+
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    """Queue an analysis in the background; follow events_url or poll status_url."""
+    if "chatFile" not in request.files:
+        return jsonify(error="File not found in the request"), 400
+
+    file = request.files["chatFile"]
+    is_valid, error_message, metadata = file_validator.validate_file(file)
+    if not is_valid:
+        return jsonify(error=error_message), 400
+    if not metadata["size"]:
+        return jsonify(error="The file is empty"), 400
+
+    chat_file = _buffer_upload(file)
+    state_file = _buffer_upload(request.files.get("previousState"))
+    try:
+        job = job_manager.submit(_analysis_job, chat_file, state_file)
+    except JobQueueFull as e:
+        _close_upload(chat_file)
+        _close_upload(state_file)
+        return jsonify(error=str(e)), 503
+
+    return (
+        jsonify(
+            dict(
+                job.to_dict(),
+                status_url=url_for("job_status", job_id=job.id),
+                events_url=url_for("job_events", job_id=job.id),
+                result_url=url_for("job_result", job_id=job.id),
+            )
+        ),
+        202,
+    )
+
+
+@app.route("/api/jobs/<job_id>")
+def job_status(job_id):
+    """Progress percent and stage of a job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify(error="Job not found or expired"), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/api/jobs/<job_id>/result")
+def job_result(job_id):
+    """Stats (and analysis state) of a finished job."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify(error="Job not found or expired"), 404
+    if job.status == "error":
+        return jsonify(job.to_dict()), 422
+    if job.status != "done":
+        return jsonify(job.to_dict()), 202
+
+    return Response(_job_result_json(job.result), mimetype="application/json")
+
+
+def _job_result_json(result):
+    # stats_json/state_json are already serialized; splice them in as-is
+    return '{"messages": %d, "stats": %s, "state": %s}' % (
+        result["messages"],
+        result["stats_json"],
+        result["state_json"],
+    )
+
+
+def _sse(event, data):
+    """Format one Server-Sent Event (data is a single-line JSON string)."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@app.route("/api/jobs/<job_id>/events")
+def job_events(job_id):
+    """
+    Server-Sent Events for a job: "progress" (status dict), "partial" (stats
+    computed so far), then "result" (as /result) or "failed".
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify(error="Job not found or expired"), 404
+
+    def stream():
+        version = -1
+        sent_partials = 0
+        last_status = None
+        while True:
+            changed = job.wait_for_change(version, timeout=SSE_KEEPALIVE_SECONDS)
+            if changed == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = changed
+            while sent_partials < len(job.partials):
+                yield _sse("partial", job.partials[sent_partials])
+                sent_partials += 1
+            status = job.to_dict()
+            if status != last_status:
+                yield _sse("progress", json.dumps(status))
+                last_status = status
+            if job.status == "done":
+                yield _sse("result", _job_result_json(job.result))
+                return
+            if job.status == "error":
+                yield _sse("failed", json.dumps(status))
+                return
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 def status_401(error):
     return redirect(url_for("dashboard"))
 
@@ -1,5 +1,6 @@
 import os
 import secrets
+import tempfile
 import logging
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -40,7 +41,30 @@ class Config:
     MAX_CONTENT_LENGTH = int(
         os.getenv("MAX_CONTENT_LENGTH", 10 * 1024 * 1024)
     )  # 10MB default
-    ALLOWED_EXTENSIONS = set(os.getenv("ALLOWED_EXTENSIONS", "txt").split(","))
+    ALLOWED_EXTENSIONS = set(os.getenv("ALLOWED_EXTENSIONS", "txt,zip,gz").split(","))
+    # Cap on the decompressed chat text of .zip/.gz uploads (zip-bomb guard)
+    MAX_UNCOMPRESSED_LENGTH = int(
+        os.getenv("MAX_UNCOMPRESSED_LENGTH", 100 * 1024 * 1024)
+    )  # 100MB default
+
+    # Short-lived in-memory cache of computed results, keyed by a hash of the
+    # upload (repeated submits/refreshes of the same file). 0 disables it.
+    RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 32))  # entries
+    RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", 300))  # seconds
+
+    # spaCy lemmatization: worker processes per language (1 = in-process)
+    # and texts per batch
+    SPACY_N_PROCESS = int(os.getenv("SPACY_N_PROCESS", 1))
+    SPACY_BATCH_SIZE = int(os.getenv("SPACY_BATCH_SIZE", 256))
+    # Load the NLP models when the app is imported (before gunicorn forks
+    # workers with --preload); /ready reports 503 until they are loaded
+    NLP_PRELOAD = os.getenv("NLP_PRELOAD", "false").lower() in {"1", "true", "yes"}
+    # "pipeline" (full spaCy pipeline per message) or "fast" (cached per-word lemmas)
+    SPACY_LEMMA_MODE = os.getenv("SPACY_LEMMA_MODE", "pipeline")
+    # spaCy pipelines per language shared by concurrent analyses in one process
+    # (match JOB_WORKERS / server threads), and seconds to wait for a free one
+    SPACY_MODEL_POOL_SIZE = int(os.getenv("SPACY_MODEL_POOL_SIZE", 2))
+    SPACY_MODEL_TIMEOUT = float(os.getenv("SPACY_MODEL_TIMEOUT", 60))
 
     # Database configuration
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///whatsanalyzer.db")
@@ -50,6 +74,22 @@ class Config:
         "pool_recycle": 3600,
     }
 
+    # Background analysis jobs (/api/jobs), run on a local thread pool
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+    JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", 16))
+    # Seconds a finished job's result is kept
+    JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", 300))
+    # Directory where every worker process shares job status and results
+    # (memory-backed /dev/shm when available); empty keeps each job in the
+    # memory of the process that runs it, which only works with one process
+    JOB_STORE_DIR = os.getenv(
+        "JOB_STORE_DIR",
+        os.path.join(
+            "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+            "whatsanalyzer-jobs",
+        ),
+    )
+
     # Redis/Celery configuration for background tasks
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
@@ -0,0 +1,46 @@
+"""Character encoding detection for chat exports."""
+
+import codecs
+
+
+def detect_encoding(prefix):
+    """
+    Guess the encoding of an export from a bounded prefix of its bytes.
+
+      - UTF-8, UTF-16 or UTF-32 byte order mark.
+      - UTF-16 without a BOM (Windows exports): many NUL bytes at even or
+        odd positions.
+      - UTF-8 if the prefix is valid UTF-8 (tolerating a character cut at
+        the end); Latin-1 otherwise.
+
+    Args:
+        prefix: First bytes of the file
+
+    Returns:
+        str: Codec name usable with codecs/open()
+    """
+    if prefix.startswith((codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE)):
+        return "utf-32"
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    if _looks_like_utf16(prefix):
+        return _utf16_byte_order(prefix)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+    except UnicodeDecodeError:
+        return "latin-1"
+    return "utf-8"
+
+
+def _looks_like_utf16(prefix):
+    """True when more than one byte in eight is NUL, as in BOM-less UTF-16."""
+    return prefix.count(0) > len(prefix) // 8
+
+
+def _utf16_byte_order(prefix):
+    """Little-endian text has its NUL bytes at odd offsets, big-endian at even."""
+    nul_even = prefix[0::2].count(0)
+    nul_odd = prefix[1::2].count(0)
+    return "utf-16-le" if nul_odd > nul_even else "utf-16-be"
@@ -0,0 +1,33 @@
+"""
+gunicorn settings, read automatically when gunicorn starts in this directory.
+
+Background analyses run in the worker that accepted them, but their status,
+partial results and results are shared through the job store (see
+jobs.JobStore and JOB_STORE_DIR), so any worker can answer a job's status,
+events and result requests.
+
+The app is preloaded in the master process and on_starting loads the NLP
+models there, before the workers fork, so all workers share one copy of the
+models copy-on-write instead of each loading its own.
+"""
+
+import os
+
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+# Event streams hold a thread for the whole analysis: use threaded workers
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in {"1", "true", "yes"}
+
+
+def on_starting(server):
+    # Runs in the master after the app has been preloaded and before any
+    # worker forks. NLP_PRELOAD=true has already loaded the models on import.
+    if not server.cfg.preload_app:
+        return
+    from app import warm_up
+    from whatsapp_statistics import nlp_status
+
+    if not nlp_status()["models_loaded"]:
+        warm_up()
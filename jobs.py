@@ -0,0 +1,433 @@
+"""Background jobs for long-running chat analyses."""
+
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger("jobs")
+
+
+class JobError(Exception):
+    """Expected job failure; its message is shown to the user as-is."""
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting or running."""
+
+
+class Job:
+    """State of a submitted job, as reported by the status endpoint."""
+
+    def __init__(self, job_id, store=None):
+        self.id = job_id
+        self.status = "queued"  # queued | running | done | error
+        self.stage = "queued"
+        self.progress = 0.0  # Percent, 0-100
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        # Partial results published while the job runs, in order
+        self.partials = []
+        # Bumped on every change, so event streams can wait for the next one
+        self.version = 0
+        self._changed = threading.Condition()
+        # Shared JobStore that lets other processes follow the job, if any
+        self._store = store
+
+    def _notify(self):
+        with self._changed:
+            self.version += 1
+            if self._store is not None:
+                self._store.save(self)
+            self._changed.notify_all()
+
+    def update(self, stage=None, progress=None):
+        """
+        Record the current stage and/or progress percent.
+
+        Args:
+            stage: Name of the current stage
+            progress: Overall progress percent (never moves backwards)
+        """
+        if stage is not None:
+            self.stage = stage
+        if progress is not None:
+            self.progress = max(self.progress, min(float(progress), 100.0))
+        self._notify()
+
+    def publish(self, partial):
+        """
+        Make a partial result available before the job finishes.
+
+        Args:
+            partial: Partial result (as the job's consumers expect it)
+        """
+        if self._store is not None:
+            self._store.save_partial(self.id, len(self.partials), partial)
+        self.partials.append(partial)
+        self._notify()
+
+    def wait_for_change(self, seen_version, timeout=None):
+        """
+        Block until the job changes after seen_version (or timeout expires).
+
+        Args:
+            seen_version: Last version the caller has seen
+            timeout: Maximum seconds to wait
+
+        Returns:
+            int: The current version
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != seen_version, timeout)
+            return self.version
+
+    @property
+    def finished(self):
+        return self.status in ("done", "error")
+
+    def to_dict(self):
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": int(self.progress),
+        }
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+class StoredJob(Job):
+    """
+    Read-only view of a job run by another process, loaded from a JobStore.
+
+    Status fields are re-read by refresh() and wait_for_change(); partial
+    results and the result are loaded from the store when first accessed.
+    """
+
+    def __init__(self, store, job_id, data):
+        self.id = job_id
+        self._store = store
+        self._partials = []
+        self._result = None
+        self._apply(data)
+
+    def _apply(self, data):
+        self.status = data["status"]
+        self.stage = data["stage"]
+        self.progress = data["progress"]
+        self.error = data["error"]
+        self.version = data["version"]
+        self.finished_at = data["finished_at"]
+        self._partial_count = data["partials"]
+
+    def refresh(self):
+        """Re-read the job's status; keeps the last one if it was purged."""
+        data = self._store.load_status(self.id)
+        if data is not None:
+            self._apply(data)
+
+    @property
+    def partials(self):
+        while len(self._partials) < self._partial_count:
+            index = len(self._partials)
+            self._partials.append(self._store.load_partial(self.id, index))
+        return self._partials
+
+    @property
+    def result(self):
+        if self._result is None and self.status == "done":
+            self._result = self._store.load_result(self.id)
+        return self._result
+
+    def update(self, stage=None, progress=None):
+        raise TypeError("Only the process running a job can update it")
+
+    def publish(self, partial):
+        raise TypeError("Only the process running a job can update it")
+
+    def wait_for_change(self, seen_version, timeout=None):
+        """Poll the store until the job changes after seen_version (or timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.refresh()
+            if self.version != seen_version:
+                return self.version
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return self.version
+            interval = self._store.poll_interval
+            if remaining is not None:
+                interval = min(interval, remaining)
+            time.sleep(interval)
+
+
+class JobStore:
+    """
+    Share job status, partial results and results between processes (e.g.
+    gunicorn workers) through files in a directory.
+
+    Each job has a status file (<id>.json), one file per partial result
+    (<id>.partial.<n>) and a result file (<id>.result.json). Files are
+    written to a temporary name and renamed into place, so readers never see
+    half-written data, and the result is saved before the status that
+    announces it. Files are private to the app's user (0600) and are
+    deleted result_ttl seconds after the job finishes (see purge).
+    """
+
+    _JOB_ID = re.compile(r"[0-9a-f]{32}")
+
+    def __init__(self, directory, poll_interval=0.25, clock=time.time):
+        """
+        Initialize job store.
+
+        Args:
+            directory: Directory shared by every process; created if missing
+            poll_interval: Seconds between reads while waiting for a change
+            clock: Function returning the wall-clock time in seconds (it is
+                compared across processes)
+        """
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.clock = clock
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def save(self, job):
+        """Write a job's status, and its result once it is done."""
+        data = {
+            "status": job.status,
+            "stage": job.stage,
+            "progress": job.progress,
+            "error": job.error,
+            "version": job.version,
+            "partials": len(job.partials),
+            "finished_at": self.clock() if job.finished else None,
+        }
+        try:
+            if job.status == "done":
+                self._write(f"{job.id}.result.json", json.dumps(job.result))
+            self._write(f"{job.id}.json", json.dumps(data))
+        except (OSError, TypeError) as e:
+            logger.error(f"Could not save job {job.id}: {e}")
+
+    def save_partial(self, job_id, index, partial):
+        try:
+            self._write(f"{job_id}.partial.{index}", json.dumps(partial))
+        except (OSError, TypeError) as e:
+            logger.error(f"Could not save job {job_id}: {e}")
+
+    def load(self, job_id, result_ttl):
+        """
+        Look up a job saved by any process.
+
+        Returns:
+            StoredJob or None: The job, or None if unknown or expired
+        """
+        data = self.load_status(job_id)
+        if data is None or self._expired(data, result_ttl):
+            return None
+        return StoredJob(self, job_id, data)
+
+    def load_status(self, job_id):
+        if not self._JOB_ID.fullmatch(job_id):
+            return None
+        return self._read(f"{job_id}.json")
+
+    def load_partial(self, job_id, index):
+        return self._read(f"{job_id}.partial.{index}")
+
+    def load_result(self, job_id):
+        return self._read(f"{job_id}.result.json")
+
+    def purge(self, result_ttl):
+        """Delete the files of jobs that finished result_ttl seconds ago."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        expired = set()
+        for name in names:
+            job_id, _, suffix = name.partition(".")
+            if suffix == "json" and self._JOB_ID.fullmatch(job_id):
+                data = self._read(name)
+                if data is not None and self._expired(data, result_ttl):
+                    expired.add(job_id)
+        # Status files go first, so nobody finds a job whose result is gone
+        for name in sorted(names, key=lambda name: name.partition(".")[2] != "json"):
+            if name.partition(".")[0] in expired:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _expired(self, data, result_ttl):
+        finished_at = data.get("finished_at")
+        return finished_at is not None and self.clock() - finished_at >= result_ttl
+
+    def _write(self, name, text):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+class JobManager:
+    """
+    Run jobs on a local thread pool and keep their results for a short time.
+
+    Finished jobs (and their results) are dropped result_ttl seconds after
+    they finish. Without a store, jobs are only known to the process that
+    created them. With a JobStore, every process sharing its directory can
+    report the status, partial results and result of any job, so the app can
+    run several gunicorn workers; see gunicorn.conf.py.
+    """
+
+    def __init__(
+        self,
+        max_workers=2,
+        result_ttl=300,
+        max_pending=16,
+        clock=time.monotonic,
+        store=None,
+    ):
+        """
+        Initialize job manager.
+
+        Args:
+            max_workers: Number of jobs that run at the same time
+            result_ttl: Seconds a finished job is kept before being discarded
+            max_pending: Maximum number of queued plus running jobs (in this
+                process)
+            clock: Function returning the current time in seconds
+            store: JobStore shared with other processes, or None
+        """
+        self.result_ttl = result_ttl
+        self.max_pending = max_pending
+        self._clock = clock
+        self._store = store
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="analysis-job"
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue fn(job, *args, **kwargs); its return value becomes job.result.
+
+        Returns:
+            Job: The queued job
+
+        Raises:
+            JobQueueFull: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            self._purge()
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise JobQueueFull("Too many analyses in progress, try again later")
+            job = Job(uuid.uuid4().hex, store=self._store)
+            self._jobs[job.id] = job
+        if self._store is not None:
+            self._store.purge(self.result_ttl)
+            # Visible to the other processes before the client can poll it
+            self._store.save(job)
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        """
+        Look up a job.
+
+        Returns:
+            Job or None: The job (a StoredJob if another process runs it), or
+            None if unknown or expired
+        """
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(job_id)
+        if job is None and self._store is not None:
+            job = self._store.load(job_id, self.result_ttl)
+        return job
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        try:
+            result = fn(job, *args, **kwargs)
+        except JobError as e:
+            job.error = str(e)
+            job.status = "error"
+        except Exception as e:
+            logger.error(f"Job failed: {e}")
+            job.error = f"Error processing the file: {e}"
+            job.status = "error"
+        else:
+            job.result = result
+            job.status = "done"
+            job.stage = "done"
+            job.progress = 100.0
+        job.finished_at = self._clock()
+        job._notify()
+
+    def _purge(self):
+        now = self._clock()
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at >= self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class ProgressReader:
+    """
+    Wrap a seekable binary stream and report how much of it has been read.
+
+    Everything except read() is delegated to the wrapped stream, so it can be
+    handed to zipfile/gzip as well as read line by line.
+    """
+
+    def __init__(self, stream, callback):
+        """
+        Initialize reader.
+
+        Args:
+            stream: Seekable binary stream
+            callback: Called with the fraction read (0.0-1.0) after each read
+        """
+        self._stream = stream
+        self._callback = callback
+        position = stream.tell()
+        self._size = stream.seek(0, 2) or 1
+        stream.seek(position)
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        self._callback(min(self._stream.tell() / self._size, 1.0))
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
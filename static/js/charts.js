@@ -193,6 +193,10 @@ ser interpretados por el parser y unirlas en una sola entrada de mensaje.
 		}
 	};
 
+	// Draws the messages-per-day chart of the current stats for a range. Set by
+	// renderCharts; the #message-range listener is registered once, at startup.
+	let renderMessageActivity = null;
+
 	const renderCharts = (stats) => {
 		const safeRender = (fn) => {
 			try {
@@ -243,9 +247,7 @@ ser interpretados por el parser y unirlas en una sola entrada de mensaje.
 
 		if (Object.keys(mensajesPorDia).length) {
 			renderMessages(rangeSelect?.value || "all");
-			if (rangeSelect) {
-				rangeSelect.addEventListener("change", (e) => renderMessages(e.target.value));
-			}
+			renderMessageActivity = renderMessages;
 		}
 
 		const mensajesPorPersona = stats.mensajes_por_persona || {};
@@ -749,6 +751,129 @@ ser interpretados por el parser y unirlas en una sola entrada de mensaje.
 		URL.revokeObjectURL(url);
 	};
 
+	const downloadState = () => {
+		// Analysis state to upload together with a newer export of the same chat
+		const el = document.getElementById("analysis-state");
+		const text = el?.textContent?.trim() || "null";
+		if (text === "null") return;
+		const blob = new Blob([text], { type: "application/json" });
+		const url = URL.createObjectURL(blob);
+		const a = document.createElement("a");
+		a.href = url;
+		a.download = `whatsapp-analysis-state-${new Date().toISOString().slice(0, 10)}.json`;
+		document.body.appendChild(a);
+		a.click();
+		document.body.removeChild(a);
+		URL.revokeObjectURL(url);
+	};
+
+	const JOB_POLL_INTERVAL_MS = 500;
+
+	const showJobProgress = (job) => {
+		document.getElementById("jobProgress")?.classList.remove("d-none");
+		const percent = `${job.progress || 0}%`;
+		const bar = document.getElementById("jobProgressBar");
+		if (bar) bar.style.width = percent;
+		const percentEl = document.getElementById("jobPercent");
+		if (percentEl) percentEl.textContent = percent;
+		const stageEl = document.getElementById("jobStage");
+		if (stageEl) stageEl.textContent = t(`job.${job.stage}`);
+	};
+
+	const showJobError = (message) => {
+		const el = document.getElementById("jobError");
+		if (!el) return;
+		el.textContent = message;
+		el.classList.remove("d-none");
+	};
+
+	// Fallback when EventSource isn't available: poll the status endpoint.
+	const pollJob = async (job) => {
+		while (job.status !== "done" && job.status !== "error") {
+			showJobProgress(job);
+			await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+			const statusResp = await fetch(job.status_url, { credentials: "same-origin" });
+			const status = await statusResp.json();
+			if (!statusResp.ok) throw new Error(status.error || statusResp.statusText);
+			job = { ...job, ...status };
+		}
+		showJobProgress(job);
+		if (job.status === "error") throw new Error(job.error);
+
+		const resultResp = await fetch(job.result_url, { credentials: "same-origin" });
+		const result = await resultResp.json();
+		if (!resultResp.ok) throw new Error(result.error || resultResp.statusText);
+		return result;
+	};
+
+	// Follow the job's Server-Sent Events: progress, partial stats as soon as the
+	// first metrics are done, then the final result. If the stream drops (e.g. a
+	// proxy or a sync server worker cuts it), keep following the job by polling.
+	const followJobEvents = (job, onPartial) =>
+		new Promise((resolve, reject) => {
+			const source = new EventSource(job.events_url);
+			source.addEventListener("progress", (event) => showJobProgress(JSON.parse(event.data)));
+			source.addEventListener("partial", (event) => onPartial(JSON.parse(event.data)));
+			source.addEventListener("result", (event) => {
+				source.close();
+				resolve(JSON.parse(event.data));
+			});
+			source.addEventListener("failed", (event) => {
+				source.close();
+				reject(new Error(JSON.parse(event.data).error));
+			});
+			source.onerror = () => {
+				source.close();
+				pollJob(job).then(resolve, reject);
+			};
+		});
+
+	// Run the upload as a background job (POST /api/jobs) and follow its progress,
+	// so large chats don't hit request timeouts. Charts are drawn from the first
+	// partial stats and refreshed as the rest arrive.
+	const submitAnalysisJob = async (form) => {
+		const submitBtn = document.getElementById("uploadSubmitBtn");
+		const uploadModal = bootstrap.Modal.getOrCreateInstance(document.getElementById("uploadModal"));
+		let shownPartial = false;
+		const showPartial = (stats) => {
+			if (!shownPartial) {
+				shownPartial = true;
+				uploadModal.hide();
+				loadData(stats);
+				return;
+			}
+			currentStats = stats;
+			updateStats(stats);
+			renderCharts(stats);
+		};
+
+		document.getElementById("jobError")?.classList.add("d-none");
+		if (submitBtn) submitBtn.disabled = true;
+		try {
+			const resp = await fetch(form.dataset.jobsUrl, {
+				method: "POST",
+				body: new FormData(form),
+				credentials: "same-origin",
+			});
+			const job = await resp.json();
+			if (!resp.ok) throw new Error(job.error || resp.statusText);
+
+			const result = window.EventSource && job.events_url ? await followJobEvents(job, showPartial) : await pollJob(job);
+
+			const stateEl = document.getElementById("analysis-state");
+			if (stateEl) stateEl.textContent = JSON.stringify(result.state);
+			uploadModal.hide();
+			document.getElementById("jobProgress")?.classList.add("d-none");
+			form.reset();
+			showPartial(result.stats);
+		} catch (err) {
+			showJobError(err.message || String(err));
+			uploadModal.show();
+		} finally {
+			if (submitBtn) submitBtn.disabled = false;
+		}
+	};
+
 	const downloadPNG = async () => {
 		const statsContent = document.getElementById("stats-content");
 		if (!statsContent || typeof html2canvas === "undefined") return;
@@ -941,6 +1066,19 @@ ser interpretados por el parser y unirlas en una sola entrada de mensaje.
 		const downloadPngBtn = document.getElementById("download-png-btn");
 		if (downloadPngBtn) downloadPngBtn.addEventListener("click", downloadPNG);
 
+		const uploadForm = document.getElementById("uploadForm");
+		if (uploadForm && window.fetch)
+			uploadForm.addEventListener("submit", (event) => {
+				event.preventDefault();
+				submitAnalysisJob(uploadForm);
+			});
+
+		const downloadStateBtn = document.getElementById("download-state-btn");
+		if (downloadStateBtn) downloadStateBtn.addEventListener("click", downloadState);
+
+		const rangeSelect = document.getElementById("message-range");
+		if (rangeSelect) rangeSelect.addEventListener("change", (e) => renderMessageActivity?.(e.target.value));
+
 		const embedded = readEmbeddedData();
 		if (isValidStats(embedded)) loadData(embedded);
 		else showEmpty();
@@ -88,13 +88,21 @@
 			// Download buttons
 			"download.json": "Download JSON",
 			"download.png": "Download PNG",
+			"download.state": "Save state for next upload",
 
 			// Modal
 			"modal.title": "Upload WhatsApp chat",
-			"modal.description": "Export your chat without media and upload the .txt file.",
-			"modal.fileLabel": ".txt file",
+			"modal.description": "Export your chat and upload the .txt file (or the .zip / .gz export).",
+			"modal.fileLabel": ".txt, .zip or .gz file",
+			"modal.stateLabel": "Previous analysis state (optional)",
+			"modal.stateHelp": "Upload the state saved from an earlier analysis of this chat to analyze only the new messages.",
 			"modal.cancel": "Cancel",
 			"modal.analyze": "Analyze",
+			"job.queued": "Waiting to start...",
+			"job.parsing": "Reading chat...",
+			"job.analyzing": "Analyzing messages...",
+			"job.finalizing": "Preparing results...",
+			"job.done": "Done",
 
 			// Language selector
 			"lang.select": "Language",
@@ -186,13 +194,21 @@
 			// Download buttons
 			"download.json": "Descargar JSON",
 			"download.png": "Descargar PNG",
+			"download.state": "Guardar estado para la próxima subida",
 
 			// Modal
 			"modal.title": "Subir chat de WhatsApp",
-			"modal.description": "Exporta tu chat sin multimedia y sube el archivo .txt.",
-			"modal.fileLabel": "Archivo .txt",
+			"modal.description": "Exporta tu chat y sube el archivo .txt (o el export .zip / .gz).",
+			"modal.fileLabel": "Archivo .txt, .zip o .gz",
+			"modal.stateLabel": "Estado de un análisis previo (opcional)",
+			"modal.stateHelp": "Sube el estado guardado de un análisis anterior de este chat para analizar sólo los mensajes nuevos.",
 			"modal.cancel": "Cancelar",
 			"modal.analyze": "Analizar",
+			"job.queued": "Esperando para empezar...",
+			"job.parsing": "Leyendo el chat...",
+			"job.analyzing": "Analizando mensajes...",
+			"job.finalizing": "Preparando resultados...",
+			"job.done": "Listo",
 
 			// Language selector
 			"lang.select": "Idioma",
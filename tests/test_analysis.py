@@ -0,0 +1,123 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from whatsapp_statistics import (
+    AnalysisState,
+    MessageTable,
+    analyze_messages,
+    build_analysis_state,
+)
+
+TEXTS = [
+    "hola, ¿cómo estás? 😀",
+    "todo bien, mirá esto https://example.com/foto",
+    "<Media omitted>",
+    "jaja 😂😂",
+    "see you tomorrow at the station",
+    "ok 👍",
+    "buenísimo, nos vemos el sábado",
+]
+
+
+def _chat(n=3000, seed=7):
+    rng = random.Random(seed)
+    table = MessageTable()
+    dt = datetime(2021, 3, 1, 8, 0)
+    for _ in range(n):
+        # Mostly quick replies, sometimes hours or days of silence
+        dt += timedelta(seconds=rng.choice([20, 90, 600, 4 * 3600, 30 * 3600]))
+        table.append(dt, rng.choice(["Ana", "Luis", "Sofía"]), rng.choice(TEXTS))
+    return table
+
+
+def test_parallel_state_matches_sequential_state():
+    messages = _chat()
+    sequential = build_analysis_state(messages, workers=1)
+
+    for workers in (2, 3):
+        parallel = build_analysis_state(
+            messages, workers=workers, parallel_min_messages=0
+        )
+        assert parallel.total_messages == sequential.total_messages
+        assert parallel.last_timestamp == sequential.last_timestamp
+        assert parallel.finalize() == sequential.finalize()
+
+
+def test_merged_partitions_match_single_pass():
+    messages = _chat()
+    expected = AnalysisState.from_messages(messages).finalize()
+
+    bounds = [0, 700, 701, 1900, len(messages)]
+    states = [
+        AnalysisState.from_messages(messages.take(range(a, b)))
+        for a, b in zip(bounds, bounds[1:])
+    ]
+    # States survive a JSON round trip before being merged
+    states = [AnalysisState.from_dict(json.loads(json.dumps(s.to_dict()))) for s in states]
+    merged = states[0]
+    for other in states[1:]:
+        merged.merge(other)
+    assert merged.finalize() == expected
+
+
+@pytest.mark.parametrize(
+    "family, key, value",
+    [
+        ("activity", "mensajes_por_hora", [0] * 23),
+        ("activity", "mensajes_por_hora", ["1"] * 24),
+        ("activity", "dias", [1, None]),
+        ("activity", "first_ts", "2021-03-01"),
+        ("conversations", "abiertas", [["Ana", 0]]),
+        ("conversations", "abiertas", [["Ana", "0", 10]]),
+        ("response_times", "respuestas", {"Ana": [10]}),
+        ("response_times", "respuestas", {"Ana": [10, "2"]}),
+        ("sentiment", "sent_global_counts", {"positive": 1, "other": 2}),
+    ],
+)
+def test_tampered_state_is_rejected(family, key, value):
+    data = json.loads(json.dumps(AnalysisState.from_messages(_chat(300)).to_dict()))
+    data["accumulators"][family][key] = value
+    with pytest.raises(ValueError, match="Estado de análisis inválido"):
+        AnalysisState.from_dict(data)
+
+
+def test_token_and_emoji_counts_match_original_analysis():
+    texts = [
+        "abc<Media omitted>def",
+        "<Media omitted>",
+        "Ⓐ mirá ⓐ 😀 Ⓩ",
+        "HTTP://EXAMPLE.COM/Foto y http://a.com/X",
+        "ver https://x.com/a<Media omitted>b ok 👍🏽",
+        "ÉL dijo Hola 😂😂 <MEDIA OMITTED>",
+        "İstanbul ǅemal ß",
+    ]
+    table = MessageTable()
+    dt = datetime(2022, 5, 1, 9, 0)
+    for i, text in enumerate(texts * 2):
+        dt += timedelta(minutes=5)
+        table.append(dt, ["Ana", "Luis"][i % 2], text)
+
+    stats = analyze_messages(table, workers=1)
+
+    # Counts produced by the analysis before tokenization was shared
+    assert stats["total_multimedia"] == 6
+    assert stats["total_links"] == 4
+    assert stats["nlp_info"]["words_processed_raw"] == 52
+    assert stats["palabras_mas_utilizadas_raw"][:4] == [
+        ("com", 6),
+        ("http", 4),
+        ("x", 4),
+        ("abcdef", 2),
+    ]
+    assert stats["total_emojis"] == 14
+    assert stats["emojis_mas_utilizados"] == [
+        ("😂", 4),
+        ("ⓐ", 2),
+        ("😀", 2),
+        ("Ⓩ", 2),
+        ("👍", 2),
+        ("🏽", 2),
+    ]
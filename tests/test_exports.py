@@ -0,0 +1,35 @@
+import gzip
+import io
+import zipfile
+
+import pytest
+
+from whatsapp_statistics import parse_chat_export
+
+CHAT = ("25/12/2021, 10:00 - Ana: hola\n" * 2000).encode("utf-8")
+
+
+def _corrupt(data, start):
+    data = bytearray(data)
+    data[start : start + 20] = b"\xff" * 20
+    return bytes(data)
+
+
+def test_gz_export_is_parsed():
+    messages = parse_chat_export(io.BytesIO(gzip.compress(CHAT)), "chat.gz")
+    assert len(messages) == 2000
+
+
+def test_corrupt_gz_deflate_stream_is_invalid_format():
+    data = _corrupt(gzip.compress(CHAT), 40)
+    with pytest.raises(ValueError, match="Archivo comprimido inválido"):
+        parse_chat_export(io.BytesIO(data), "chat.gz")
+
+
+def test_corrupt_zip_deflate_stream_is_invalid_format():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("_chat.txt", CHAT)
+    data = _corrupt(buffer.getvalue(), 60)
+    with pytest.raises(ValueError, match="Archivo comprimido inválido"):
+        parse_chat_export(io.BytesIO(data), "chat.zip")
@@ -0,0 +1,71 @@
+import threading
+
+from jobs import JobError, JobManager, JobStore
+
+
+def _managers(tmp_path, **store_options):
+    # Two managers sharing a store directory stand in for two gunicorn workers
+    return tuple(
+        JobManager(store=JobStore(str(tmp_path), poll_interval=0.01, **store_options))
+        for _ in range(2)
+    )
+
+
+def test_other_process_follows_job_through_store(tmp_path):
+    owner, other = _managers(tmp_path)
+    release = threading.Event()
+
+    def analysis(job):
+        job.update("analyzing", 40)
+        job.publish('{"partial": 1}')
+        release.wait(5)
+        return {"messages": 3}
+
+    job = owner.submit(analysis)
+    seen = other.get(job.id)
+    assert seen is not None and seen is not job
+
+    version = seen.wait_for_change(-1, timeout=5)
+    while seen.partials == []:
+        version = seen.wait_for_change(version, timeout=5)
+    assert seen.partials == ['{"partial": 1}']
+    assert seen.to_dict() == job.to_dict()
+
+    release.set()
+    while not seen.finished:
+        version = seen.wait_for_change(version, timeout=5)
+    assert seen.status == "done" and seen.progress == 100.0
+    assert seen.result == {"messages": 3}
+    owner.shutdown()
+
+
+def test_other_process_sees_job_error(tmp_path):
+    owner, other = _managers(tmp_path)
+
+    def analysis(job):
+        raise JobError("No valid WhatsApp messages found in the file")
+
+    job = owner.submit(analysis)
+    owner.shutdown()
+    seen = other.get(job.id)
+    assert seen.status == "error"
+    assert seen.to_dict()["error"] == "No valid WhatsApp messages found in the file"
+
+
+def test_finished_jobs_expire_from_store(tmp_path):
+    now = [1000.0]
+    owner, other = _managers(tmp_path, clock=lambda: now[0])
+    job = owner.submit(lambda job: {"messages": 1})
+    owner.shutdown()
+    assert other.get(job.id).result == {"messages": 1}
+
+    now[0] += owner.result_ttl
+    assert other.get(job.id) is None
+    owner._store.purge(owner.result_ttl)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unknown_or_malformed_job_ids(tmp_path):
+    _, other = _managers(tmp_path)
+    assert other.get("0" * 32) is None
+    assert other.get("../../etc/passwd") is None
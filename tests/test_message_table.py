@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+import whatsapp_statistics
+from whatsapp_statistics import MessageTable
+
+
+def _table(timestamps):
+    table = MessageTable()
+    for i, ts in enumerate(timestamps):
+        table.append_timestamp(ts, f"user{i % 3}", f"message {i} ✓")
+    return table
+
+
+def _stable_sorted_rows(table):
+    order = sorted(range(len(table)), key=table.timestamps.__getitem__)
+    return [table[i] for i in order]
+
+
+def test_sorted_table_is_returned_as_is():
+    table = _table(range(0, 1000, 10))
+    assert table.sorted_by_time() is table
+
+
+def test_repeated_hour_is_merged_back_in_place():
+    # A daylight-saving change repeats an hour early in the export
+    timestamps = [60 * i for i in range(2000)]
+    for i in range(100, 160):
+        timestamps[i] -= 3600
+    table = _table(timestamps)
+
+    result = table.sorted_by_time()
+
+    assert result.is_chronological
+    assert list(result) == _stable_sorted_rows(table)
+
+
+def test_displaced_rows_sort_like_a_stable_sort():
+    rng = random.Random(5)
+    for _ in range(50):
+        timestamps = sorted(rng.randrange(500) for _ in range(300))
+        for _ in range(rng.randint(1, 4)):
+            i, j = rng.randrange(300), rng.randrange(300)
+            timestamps.insert(j, timestamps.pop(i))
+        table = _table(timestamps)
+
+        result = table.sorted_by_time()
+
+        assert result.is_chronological
+        assert list(result) == _stable_sorted_rows(table)
+
+
+def test_numpy_columns_loads_numpy_on_first_use(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(whatsapp_statistics, "np", None)
+    monkeypatch.setattr(whatsapp_statistics, "_numpy_loaded", False)
+
+    timestamps, sender_ids = _table([10, 20, 30]).numpy_columns()
+
+    assert timestamps.tolist() == [10, 20, 30]
+    assert sender_ids.tolist() == [0, 1, 2]
@@ -0,0 +1,108 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from whatsapp_statistics import SpacyModelPool
+
+
+class CountingLoader:
+    """Stands in for spacy.load: slow, and counts the pipelines it builds."""
+
+    def __init__(self, delay=0.002):
+        self.delay = delay
+        self.loaded = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, lang):
+        time.sleep(self.delay)
+        with self._lock:
+            self.loaded += 1
+        return object()
+
+
+def _hammer(pool, threads=8, checkouts=20, hold=0.0005):
+    in_use = set()
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+    errors = []
+
+    def work():
+        start.wait()
+        for _ in range(checkouts):
+            with pool.model("en") as nlp:
+                with lock:
+                    if id(nlp) in in_use:
+                        errors.append("pipeline checked out twice")
+                    in_use.add(id(nlp))
+                time.sleep(hold)
+                with lock:
+                    in_use.discard(id(nlp))
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return errors
+
+
+@pytest.fixture
+def frequent_thread_switches():
+    # Switch threads as often as possible, so races show up in a few trials
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3])
+def test_pool_never_builds_more_than_size_models(size, frequent_thread_switches):
+    for _ in range(300):
+        loader = CountingLoader(delay=0)
+        pool = SpacyModelPool(size=size, timeout=10, loader=loader)
+
+        errors = _hammer(pool, checkouts=1, hold=0)
+
+        assert errors == []
+        assert loader.loaded <= size
+        assert pool.loaded("en") == loader.loaded
+
+
+def test_pipelines_are_never_shared():
+    pool = SpacyModelPool(size=2, timeout=10, loader=CountingLoader())
+    assert _hammer(pool) == []
+
+
+def test_fill_respects_size_with_concurrent_checkouts():
+    loader = CountingLoader()
+    pool = SpacyModelPool(size=2, timeout=10, loader=loader)
+    filler = threading.Thread(target=pool.fill, args=("en",))
+    filler.start()
+    errors = _hammer(pool, threads=4, checkouts=5)
+    filler.join()
+
+    assert errors == []
+    assert loader.loaded == pool.loaded("en") == 2
+
+
+def test_checkout_times_out_when_every_model_is_busy():
+    pool = SpacyModelPool(size=1, timeout=0.05, loader=CountingLoader(0))
+    with pool.model("en"):
+        with pytest.raises(TimeoutError):
+            with pool.model("en"):
+                pass
+    with pool.model("en") as nlp:
+        assert nlp is not None
+
+
+def test_missing_model_is_not_retried():
+    calls = []
+    pool = SpacyModelPool(size=2, loader=lambda lang: calls.append(lang))
+
+    assert pool.available("xx") is False
+    with pool.model("xx") as nlp:
+        assert nlp is None
+    assert calls == ["xx"]
+    assert pool.loaded("xx") == 0
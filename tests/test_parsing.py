@@ -0,0 +1,69 @@
+import time
+
+from whatsapp_statistics import parse_chat, parse_chat_stream
+
+
+def _multiline_chat(continuation_lines):
+    lines = ["25/12/2021, 10:00 - Ana: first line\n"]
+    lines += [f"continuation {i}\n" for i in range(continuation_lines)]
+    lines.append("25/12/2021, 10:01 - Luis: reply\n")
+    return lines
+
+
+def _parse_seconds(lines):
+    start = time.perf_counter()
+    messages = parse_chat_stream(iter(lines))
+    return time.perf_counter() - start, messages
+
+
+def test_multiline_message_is_joined_once():
+    _, messages = _parse_seconds(_multiline_chat(50_000))
+
+    assert len(messages) == 2
+    text = messages[0]["message"].split("\n")
+    assert len(text) == 50_001
+    assert text[0] == "first line"
+    assert text[-1] == "continuation 49999"
+    assert messages[1]["message"] == "reply"
+
+
+def test_multiline_message_parses_in_linear_time():
+    small = min(_parse_seconds(_multiline_chat(5_000))[0] for _ in range(3))
+    large = min(_parse_seconds(_multiline_chat(50_000))[0] for _ in range(3))
+
+    # 10x the lines: linear parsing takes ~10x as long, quadratic ~100x.
+    assert large < 30 * max(small, 1e-4)
+
+
+def _write_chat_with_long_middle_message(path):
+    lines = []
+    for i in range(300):
+        lines.append(f"{1 + i // 60}/01/2022, 10:{i % 60:02d} - Ana: before {i}\n")
+    # Spans the middle of the file, so chunk boundaries fall inside it
+    lines.append("06/01/2022, 09:00 - Luis: long message\n")
+    lines += [f"line {i} of the long message\n" for i in range(600)]
+    for i in range(300):
+        lines.append(f"{7 + i // 60}/01/2022, 11:{i % 60:02d} - Ana: after {i}\n")
+    path.write_text("".join(lines), encoding="utf-8")
+    return path
+
+
+def test_parallel_parse_matches_sequential(tmp_path):
+    chat = _write_chat_with_long_middle_message(tmp_path / "chat.txt")
+    size = chat.stat().st_size
+    # The long message covers the midpoint, where a 2-way split would cut
+    with open(chat, "rb") as f:
+        data = f.read()
+    start = data.index(b"long message")
+    end = data.index(b"after 0")
+    assert start < size // 2 < end
+
+    sequential = list(parse_chat(str(chat), workers=1))
+    for workers in (2, 3, 4):
+        parallel = parse_chat(str(chat), workers=workers, parallel_min_bytes=0)
+        assert list(parallel) == sequential
+
+    assert len(sequential) == 601
+    long_message = sequential[300]["message"].split("\n")
+    assert long_message[0] == "long message"
+    assert len(long_message) == 601
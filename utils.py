@@ -1,9 +1,14 @@
 """Utility functions for file handling and validation."""
 
 import os
+import time
 import hashlib
+import threading
+from collections import OrderedDict
 from werkzeug.utils import secure_filename
 
+from encoding import detect_encoding
+
 # Optional import - python-magic requires native libmagic library
 try:
     import magic
@@ -13,6 +18,13 @@ except (ImportError, OSError):
     MAGIC_AVAILABLE = False
 
 
+# MIME types accepted for compressed chat exports, by extension
+ARCHIVE_MIME_TYPES = {
+    "zip": {"application/zip", "application/x-zip-compressed"},
+    "gz": {"application/gzip", "application/x-gzip"},
+}
+
+
 class FileValidator:
     """Validate uploaded files for security and size constraints."""
 
@@ -60,12 +72,14 @@ class FileValidator:
 
         return size <= self.max_size_bytes, size
 
-    def validate_mime_type(self, file_stream):
+    def validate_mime_type(self, file_stream, extension=None):
         """
-        Validate file MIME type (text/plain for .txt files).
+        Validate file MIME type (text/plain for .txt files, the archive types
+        in ARCHIVE_MIME_TYPES for .zip/.gz exports).
 
         Args:
             file_stream: File stream object
+            extension: Lowercase file extension, if known
 
         Returns:
             tuple: (is_valid, mime_type)
@@ -87,6 +101,13 @@ class FileValidator:
                 # Fallback: simple text detection when magic not available
                 mime = self._simple_text_detection(header)
 
+            if extension in ARCHIVE_MIME_TYPES:
+                is_valid = (
+                    mime in ARCHIVE_MIME_TYPES[extension]
+                    or mime == "application/octet-stream"
+                )
+                return is_valid, mime
+
             # Allow text files
             is_valid = mime.startswith("text/") or mime == "application/octet-stream"
             return is_valid, mime
@@ -105,19 +126,18 @@ class FileValidator:
         Returns:
             str: MIME type
         """
-        try:
-            # Try to decode as UTF-8 or Latin-1
-            try:
-                data.decode("utf-8")
-                return "text/plain"
-            except UnicodeDecodeError:
-                try:
-                    data.decode("latin-1")
-                    return "text/plain"
-                except:
-                    return "application/octet-stream"
-        except:
+        # Recognize compressed exports by their magic numbers
+        if data.startswith(b"PK\x03\x04"):
+            return "application/zip"
+        if data.startswith(b"\x1f\x8b"):
+            return "application/gzip"
+
+        # Single pass over the header: BOM / UTF-16 / UTF-8 validity. Anything
+        # that isn't UTF-8 or UTF-16 is treated as Latin-1 unless it has NULs.
+        encoding = detect_encoding(data)
+        if encoding == "latin-1" and b"\x00" in data:
             return "application/octet-stream"
+        return "text/plain"
 
     def sanitize_filename(self, filename):
         """
@@ -136,8 +156,8 @@ class FileValidator:
         if not safe_name or safe_name == "":
             safe_name = "unnamed.txt"
 
-        # Ensure it has .txt extension
-        if not safe_name.endswith(".txt"):
+        # Ensure it has an allowed extension (.txt by default)
+        if not self.validate_extension(safe_name):
             safe_name += ".txt"
 
         return safe_name
@@ -175,7 +195,8 @@ class FileValidator:
             return False, f"File too large. Maximum size: {max_mb:.1f}MB", metadata
 
         # Validate MIME type
-        is_valid_mime, mime_type = self.validate_mime_type(file_obj.stream)
+        extension = file_obj.filename.rsplit(".", 1)[1].lower()
+        is_valid_mime, mime_type = self.validate_mime_type(file_obj.stream, extension)
         metadata["mime_type"] = mime_type
 
         if not is_valid_mime:
@@ -192,25 +213,113 @@ class FileValidator:
         return True, None, metadata
 
 
-def compute_file_hash(content, algorithm="sha256"):
+def compute_file_hash(content, algorithm="sha256", chunk_size=64 * 1024):
     """
     Compute hash of file content for deduplication.
 
     Args:
-        content: File content (string or bytes)
+        content: File content (string or bytes), or a seekable binary stream
+            (read in chunks and rewound afterwards)
         algorithm: Hash algorithm to use
+        chunk_size: Read size when hashing a stream
 
     Returns:
         str: Hex digest of hash
     """
+    hasher = hashlib.new(algorithm)
+
+    if hasattr(content, "read"):
+        content.seek(0)
+        for chunk in iter(lambda: content.read(chunk_size), b""):
+            hasher.update(chunk)
+        content.seek(0)
+        return hasher.hexdigest()
+
     if isinstance(content, str):
         content = content.encode("utf-8")
 
-    hasher = hashlib.new(algorithm)
     hasher.update(content)
     return hasher.hexdigest()
 
 
+class ResultCache:
+    """
+    Thread-safe in-memory LRU cache whose entries expire after a fixed TTL.
+
+    Meant for computed analysis results keyed by a content hash (see
+    compute_file_hash), never for the uploaded chats themselves. A cache with
+    max_entries or ttl_seconds of 0 stores nothing.
+    """
+
+    def __init__(self, max_entries=32, ttl_seconds=300, clock=time.monotonic):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Maximum number of entries kept (least recently used
+                are evicted first)
+            ttl_seconds: Lifetime of an entry, counted from when it was stored
+            clock: Function returning the current time in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key):
+        """
+        Look up a cached value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """
+        Store a value, evicting expired and least recently used entries.
+
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            now = self._clock()
+            self._entries[key] = (now + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            for stale in [k for k, (exp, _) in self._entries.items() if exp <= now]:
+                del self._entries[stale]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
 def format_file_size(size_bytes):
     """
     Format file size in human-readable format.
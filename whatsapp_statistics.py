@@ -1,22 +1,51 @@
+import io
 import re
+import os
+import gzip
 import json
-from datetime import datetime, timedelta
-from collections import Counter, defaultdict
+import mmap
+import codecs
+import bisect
+import hashlib
+import zipfile
+import zlib
+import importlib.util
+import threading
+import time
+from array import array
+from datetime import date, datetime, timedelta
+from collections import Counter, OrderedDict, defaultdict, deque
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import chain, islice, repeat
 
 from functools import lru_cache
 
-try:
-    import spacy  # type: ignore
-except Exception:  # pragma: no cover
-    spacy = None
+from encoding import detect_encoding
+
+# spaCy, VADER y NumPy son opcionales y se importan recién al usarlos (ver
+# _import_spacy, _get_vader y _load_numpy): importar este módulo es barato.
+np = None
+_numpy_loaded = False
+
+
+def _load_numpy():
+    """Importa NumPy en el primer uso; retorna el módulo, o None si no está."""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        try:
+            import numpy  # type: ignore
+        except Exception:  # pragma: no cover
+            numpy = None
+        np = numpy
+        _numpy_loaded = True
+    return np
 
-try:
-    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer  # type: ignore
-except Exception:  # pragma: no cover
-    SentimentIntensityAnalyzer = None
 
 # --- Expresiones Regulares ---
-# Se admite una coma opcional y año de 2 o 4 dígitos.
+# Encabezado de un export de Android en formato 24 h (ver CHAT_DIALECTS para
+# el resto de formatos). Se admite una coma opcional y año de 2 o 4 dígitos.
 message_pattern = re.compile(r"^(\d{1,2}/\d{1,2}/\d{2,4}),?\s+(\d{1,2}:\d{2}) - (.*)$")
 
 # Para detectar emojis individualmente (rangos Unicode ampliados)
@@ -45,14 +74,81 @@ emoji_pattern = re.compile(
     flags=re.UNICODE,
 )
 
+# Cantidad de líneas iniciales que se inspeccionan para elegir el dialecto
+# (Android/iOS, 24 h/12 h) del export.
+DIALECT_SAMPLE_LINES = 500
+
+# Cantidad máxima de encabezados que se inspeccionan para deducir el orden de
+# la fecha (día/mes o mes/día) de un export antes de parsearlo completo.
+DATE_SAMPLE_HEADERS = 1000
+
+# Tamaño a partir del cual parse_chat reparte el archivo entre varios procesos
+# (si se le pasa workers > 1).
+PARALLEL_PARSE_MIN_BYTES = 32 * 1024 * 1024
+
+# Cantidad de mensajes a partir de la cual analyze_messages reparte el análisis
+# entre varios procesos (si se le pasa workers > 1).
+PARALLEL_ANALYZE_MIN_MESSAGES = 200_000
+
+# Prefijo (en bytes) que se inspecciona para decidir la codificación.
+ENCODING_SNIFF_BYTES = 256 * 1024
+
+# Tamaño de bloque para la lectura incremental de streams binarios (subidas).
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Margen con el que parse_chat(since=...) empieza a parsear antes de `since`,
+# por si el export tiene mensajes levemente desordenados (cambios de horario).
+TAIL_SEARCH_MARGIN = timedelta(days=1)
+
+# Versión del formato de AnalysisState.to_dict (estado guardado entre análisis).
+ANALYSIS_STATE_VERSION = 1
+
+# Cada cuántos mensajes se informa el avance del análisis (callback `progress`).
+PROGRESS_EVERY_MESSAGES = 5000
+
+# Textos distintos cuyo puntaje VADER se recuerda durante un análisis: los
+# chats repiten muchísimo los mensajes cortos ("ok", "jaja", "👍").
+SENTIMENT_CACHE_SIZE = 50_000
+
+# Lematización con spaCy: textos por lote y procesos por idioma (1 = en el
+# mismo proceso del análisis). Se ajustan con configure_spacy.
+SPACY_BATCH_SIZE = 256
+SPACY_N_PROCESS = 1
+
+# "pipeline": cada mensaje pasa por spaCy. "fast": cada palabra distinta se
+# lematiza una vez (sin contexto) y se cuenta por búsqueda en un cache por
+# idioma de hasta SPACY_LEMMA_CACHE_SIZE palabras; ver compare_lemma_modes.
+# El cache es de cada análisis (las palabras de un chat no quedan en memoria
+# después de su resultado).
+LEMMA_MODES = ("pipeline", "fast")
+SPACY_LEMMA_MODE = "pipeline"
+SPACY_LEMMA_CACHE_SIZE = 100_000
+
+# Pipelines de spaCy por idioma que comparten los análisis concurrentes de un
+# proceso (un pipeline no se usa desde dos hilos a la vez) y segundos que un
+# análisis espera uno libre. Se ajustan con configure_spacy.
+SPACY_MODEL_POOL_SIZE = 2
+SPACY_MODEL_TIMEOUT = 60.0
+
+# Componentes de spaCy necesarios para obtener lemas; el resto del pipeline
+# se desactiva. El lematizador español usa el POS del morphologizer.
+SPACY_LEMMA_COMPONENTS = (
+    "tok2vec",
+    "tagger",
+    "morphologizer",
+    "attribute_ruler",
+    "lemmatizer",
+)
+
 # Patrón para identificar links
 link_pattern = re.compile(r"https?://\S+")
 
 _basic_word_pattern = re.compile(r"\b\w+\b", flags=re.UNICODE)
 
 
-def _basic_stopwords_en():
-    return {
+# Stopwords propias (se completan con las de spaCy en _stopword_sets)
+BASIC_STOPWORDS_EN = frozenset(
+    {
         # Articles & Determiners
         "the",
         "a",
@@ -283,10 +379,10 @@ def _basic_stopwords_en():
         "try",
         "keep",
     }
+)
 
-
-def _basic_stopwords_es():
-    return {
+BASIC_STOPWORDS_ES = frozenset(
+    {
         # Artículos
         "el",
         "la",
@@ -650,25 +746,322 @@ def _basic_stopwords_es():
         "años",
         "vida",
     }
+)
+
+
+@lru_cache(maxsize=1)
+def _import_spacy():
+    """Import spaCy on first use (it takes seconds); None if it isn't installed."""
+    try:
+        import spacy  # type: ignore
+    except Exception:  # pragma: no cover
+        return None
+    return spacy
+
+
+@lru_cache(maxsize=1)
+def _spacy_installed():
+    # Without importing it, so cheap metrics never pay for spaCy's import
+    try:
+        return importlib.util.find_spec("spacy") is not None
+    except (ImportError, ValueError):
+        return False
 
 
-@lru_cache(maxsize=8)
-def _get_spacy_nlp(lang: str):
-    """Lazy-load spaCy pipelines. Returns None if spaCy (or model) isn't available."""
+def _load_spacy_model(lang: str):
+    """Load a new spaCy pipeline. Returns None if spaCy (or model) isn't available."""
+    spacy = _import_spacy()
     if spacy is None:
         return None
 
     model = "en_core_web_sm" if lang == "en" else "es_core_news_sm"
     try:
-        # Disable components not needed for lemmatization to keep it fast.
-        return spacy.load(model, disable=["ner", "parser"])
+        # Keep only the components needed for lemmas to keep it fast.
+        nlp = spacy.load(model, exclude=["ner", "parser"])
+        nlp.select_pipes(
+            enable=[name for name in nlp.pipe_names if name in SPACY_LEMMA_COMPONENTS]
+        )
+        return nlp
     except Exception:
         return None
 
 
+class SpacyModelPool:
+    """
+    Bounded pool of spaCy pipelines per language.
+
+    A spaCy Language object must not run nlp.pipe from two threads at once,
+    so every analysis checks a pipeline out for one batch and returns it.
+    Up to `size` pipelines per language are loaded on demand; when all of
+    them are busy, model() waits up to `timeout` seconds for one.
+    """
+
+    def __init__(self, size=2, timeout=60.0, loader=_load_spacy_model):
+        """
+        Initialize pool.
+
+        Args:
+            size: Maximum pipelines loaded per language
+            timeout: Seconds model() waits for a free pipeline
+            loader: Function lang -> new pipeline (or None if unavailable)
+        """
+        self.size = size
+        self.timeout = timeout
+        self._loader = loader
+        self._idle = defaultdict(list)
+        self._created = Counter()  # Idle, checked out or being loaded
+        self._ready = set()  # Languages with at least one pipeline loaded
+        self._missing = set()
+        self._cond = threading.Condition()
+
+    def _after_fork(self):
+        # Pipelines checked out by other threads at fork time stay with the
+        # parent; the child keeps the idle ones (shared copy-on-write).
+        self._cond = threading.Condition()
+        self._created = Counter({lang: len(idle) for lang, idle in self._idle.items()})
+        self._ready = {lang for lang, idle in self._idle.items() if idle}
+
+    def available(self, lang):
+        """Whether `lang` has a model; loads the first pipeline if needed."""
+        with self._cond:
+            if lang in self._ready:
+                return True
+            if lang in self._missing:
+                return False
+        with self.model(lang) as nlp:
+            return nlp is not None
+
+    def loaded(self, lang):
+        """Pipelines loaded for `lang` (never loads anything)."""
+        with self._cond:
+            return self._created[lang]
+
+    def fill(self, lang):
+        """Load pipelines for `lang` until the pool is full."""
+        while True:
+            with self._cond:
+                if lang in self._missing or self._created[lang] >= self.size:
+                    return
+                self._created[lang] += 1
+            nlp = self._load(lang)
+            if nlp is not None:
+                self._checkin(lang, nlp)
+
+    @contextmanager
+    def model(self, lang, timeout=None):
+        """
+        Check out a pipeline for `lang` (None if there is no model).
+
+        Raises:
+            TimeoutError: If every pipeline stays busy for `timeout` seconds
+        """
+        nlp = self._checkout(lang, self.timeout if timeout is None else timeout)
+        try:
+            yield nlp
+        finally:
+            if nlp is not None:
+                self._checkin(lang, nlp)
+
+    def _checkout(self, lang, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if lang in self._missing:
+                    return None
+                if self._idle[lang]:
+                    return self._idle[lang].pop()
+                if self._created[lang] < self.size:
+                    # Reserve the slot before releasing the lock
+                    self._created[lang] += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"No spaCy '{lang}' model became free within {timeout:g}s"
+                    )
+                self._cond.wait(remaining)
+        return self._load(lang)
+
+    def _load(self, lang):
+        # Loads into a slot already reserved in _created. Loading takes
+        # seconds, so the lock isn't held; the slot is given back on failure.
+        try:
+            nlp = self._loader(lang)
+        except Exception:
+            nlp = None
+        with self._cond:
+            if nlp is None:
+                self._created[lang] -= 1
+                self._missing.add(lang)
+                self._cond.notify_all()
+            else:
+                self._ready.add(lang)
+        return nlp
+
+    def _checkin(self, lang, nlp):
+        with self._cond:
+            self._idle[lang].append(nlp)
+            self._cond.notify()
+
+
+# spaCy pipelines shared by every analysis (and thread) of this process
+_spacy_models = SpacyModelPool(size=SPACY_MODEL_POOL_SIZE, timeout=SPACY_MODEL_TIMEOUT)
+os.register_at_fork(after_in_child=_spacy_models._after_fork)
+
+
+def configure_spacy(
+    n_process=None, batch_size=None, lemma_mode=None, pool_size=None, pool_timeout=None
+):
+    """
+    Set how spaCy lemmatization runs (None leaves a setting unchanged).
+
+    Args:
+        n_process: Worker processes per language; 1 runs spaCy in-process
+        batch_size: Texts sent to spaCy at a time
+        lemma_mode: "pipeline" or "fast" (see LEMMA_MODES)
+        pool_size: Pipelines per language shared by concurrent analyses
+        pool_timeout: Seconds an analysis waits for a free pipeline
+    """
+    global SPACY_N_PROCESS, SPACY_BATCH_SIZE, SPACY_LEMMA_MODE
+    if lemma_mode is not None:
+        if lemma_mode not in LEMMA_MODES:
+            raise ValueError(
+                f"Unknown lemma mode: {lemma_mode}. Available: {', '.join(LEMMA_MODES)}"
+            )
+        SPACY_LEMMA_MODE = lemma_mode
+    if n_process is not None:
+        SPACY_N_PROCESS = max(1, int(n_process))
+    if batch_size is not None:
+        SPACY_BATCH_SIZE = max(1, int(batch_size))
+    if pool_size is not None:
+        _spacy_models.size = max(1, int(pool_size))
+    if pool_timeout is not None:
+        _spacy_models.timeout = max(0.0, float(pool_timeout))
+
+
+# Per-language process pools for spaCy, shared by every analysis
+_spacy_pools = {}
+_spacy_pools_lock = threading.Lock()
+
+
+def _reset_spacy_pools():
+    # A forked child can't use its parent's pools (or a lock held mid-fork)
+    global _spacy_pools_lock
+    _spacy_pools.clear()
+    _spacy_pools_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_spacy_pools)
+
+
+def _spacy_pool(lang):
+    with _spacy_pools_lock:
+        key = (lang, SPACY_N_PROCESS)
+        pool = _spacy_pools.get(key)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=SPACY_N_PROCESS)
+            _spacy_pools[key] = pool
+        return pool
+
+
+@lru_cache(maxsize=1)
+def _stopword_sets():
+    """(stop_en, stop_es) frozensets: built-in stopwords plus spaCy's when available."""
+    stop_en = BASIC_STOPWORDS_EN
+    stop_es = BASIC_STOPWORDS_ES
+
+    if _import_spacy() is not None:
+        try:
+            from spacy.lang.en.stop_words import STOP_WORDS as SPACY_STOP_EN  # type: ignore
+
+            stop_en |= SPACY_STOP_EN
+        except Exception:
+            pass
+        try:
+            from spacy.lang.es.stop_words import STOP_WORDS as SPACY_STOP_ES  # type: ignore
+
+            stop_es |= SPACY_STOP_ES
+        except Exception:
+            pass
+    return stop_en, stop_es
+
+
+def _lemma_stopwords(lang):
+    # Use both stopword sets regardless of detected language for bilingual chats.
+    stop_en, stop_es = _stopword_sets()
+    return (stop_en, stop_es) if lang == "en" else (stop_es, stop_en)
+
+
+def _doc_lemmas(doc, stop_primary, stop_secondary):
+    """Countable lemmas of a spaCy doc: alphabetic, 2+ chars, not stopwords."""
+    for tok in doc:
+        if tok.is_space or tok.is_punct:
+            continue
+        if not tok.is_alpha:
+            continue
+        lemma = (tok.lemma_ or tok.text).lower().strip()
+        if not lemma or lemma == "-pron-":
+            lemma = tok.text.lower().strip()
+        if len(lemma) < 2:
+            continue
+        if lemma in stop_primary or lemma in stop_secondary:
+            continue
+        yield lemma
+
+
+def _count_lemmas(nlp, texts, lang, counter):
+    """Count the lemmas of `texts` (minus stopwords) into `counter`."""
+    stop_primary, stop_secondary = _lemma_stopwords(lang)
+    for doc in nlp.pipe(texts, batch_size=SPACY_BATCH_SIZE):
+        counter.update(_doc_lemmas(doc, stop_primary, stop_secondary))
+
+
+def _fast_lemmas(nlp, lang, word_lists, cache):
+    """
+    Lemmas for every distinct word in `word_lists`: words in `cache` (word ->
+    tuple of lemmas, one analysis' cache for `lang`) are looked up, the
+    unseen ones go through spaCy once each (as one-word docs) and are added
+    to it. Once the cache holds SPACY_LEMMA_CACHE_SIZE words, new words are
+    still lemmatized but not cached.
+
+    Returns:
+        dict: word -> tuple of countable lemmas
+    """
+    lemmas = {}
+    unseen = []
+    for words in word_lists:
+        for word in words:
+            if word in lemmas:
+                continue
+            cached = cache.get(word)
+            lemmas[word] = cached
+            if cached is None:
+                unseen.append(word)
+    if unseen:
+        stop_primary, stop_secondary = _lemma_stopwords(lang)
+        docs = nlp.pipe(unseen, batch_size=SPACY_BATCH_SIZE)
+        for word, doc in zip(unseen, docs):
+            word_lemmas = tuple(_doc_lemmas(doc, stop_primary, stop_secondary))
+            lemmas[word] = word_lemmas
+            if len(cache) < SPACY_LEMMA_CACHE_SIZE:
+                cache[word] = word_lemmas
+    return lemmas
+
+
+def _lemma_counts(lang, texts):
+    """Lemma counts for one batch; runs in the spaCy worker processes."""
+    counter = Counter()
+    with _spacy_models.model(lang) as nlp:
+        _count_lemmas(nlp, texts, lang, counter)
+    return counter
+
+
 @lru_cache(maxsize=2)
 def _get_vader():
-    if SentimentIntensityAnalyzer is None:
+    # Imported on first use, like spaCy
+    try:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer  # type: ignore
+    except Exception:
         return None
     try:
         return SentimentIntensityAnalyzer()
@@ -676,14 +1069,55 @@ def _get_vader():
         return None
 
 
-def _detect_lang_fast(text: str, stop_en: set, stop_es: set) -> str:
+_nlp_warmed_up = False
+
+
+def warm_up_nlp():
+    """
+    Load everything the NLP metrics use (stopwords, spaCy models, VADER and
+    NumPy) now instead of on the first analysis. Call it in a pre-fork
+    server's master process (e.g. gunicorn --preload) so the models are
+    loaded once and shared copy-on-write by every worker. The spaCy model
+    pool is filled, i.e. SPACY_MODEL_POOL_SIZE pipelines per language.
+
+    Returns:
+        dict: Same as nlp_status()
+    """
+    global _nlp_warmed_up
+    _load_numpy()
+    _stopword_sets()
+    _spacy_models.fill("en")
+    _spacy_models.fill("es")
+    _get_vader()
+    _nlp_warmed_up = True
+    return nlp_status()
+
+
+def nlp_status():
+    """
+    Report whether warm_up_nlp() has run in this process (inherited through
+    fork) and what it loaded; never loads anything itself.
+    """
+    if not _nlp_warmed_up:
+        return {"models_loaded": False}
+    return {
+        "models_loaded": True,
+        "spacy_en_model": _spacy_models.loaded("en") > 0,
+        "spacy_es_model": _spacy_models.loaded("es") > 0,
+        "spacy_model_pool": {lang: _spacy_models.loaded(lang) for lang in ("en", "es")},
+        "sentiment_engine": "vader" if _get_vader() is not None else "disabled",
+        "numpy": np is not None,
+    }
+
+
+def _detect_lang_fast(words: list, stop_en: set, stop_es: set) -> str:
     """Heuristic language detector: compares stopword hits for EN vs ES."""
     # Limit token scan for performance on long messages.
-    tokens = _basic_word_pattern.findall(text.lower())[:60]
+    tokens = words[:60]
     if not tokens:
         return "en"
-    en_hits = sum(1 for t in tokens if t in stop_en)
-    es_hits = sum(1 for t in tokens if t in stop_es)
+    en_hits = sum(map(stop_en.__contains__, tokens))
+    es_hits = sum(map(stop_es.__contains__, tokens))
     return "es" if es_hits > en_hits else "en"
 
 
@@ -693,6 +1127,45 @@ def _normalize_text_for_nlp(text: str) -> str:
     return text
 
 
+class MessageTokens:
+    """
+    Tokens of one message, computed once by `tokenize` and shared by the
+    text, emoji and word metrics:
+      - words: lowercased words, without links or the media marker (what the
+        NLP fallback and language detection use).
+      - raw_words: words including the pieces of links (what the raw word
+        counts use); the same list as `words` when the message has neither
+        links nor a media marker.
+      - emojis: emojis in order of appearance.
+      - links: number of links.
+    """
+
+    __slots__ = ("words", "raw_words", "emojis", "links")
+
+
+def tokenize(text):
+    tokens = MessageTokens()
+    # Word, link and emoji counts drop the exact media marker and keep the
+    # original case for links and emojis; the NLP words replace the marker
+    # with a space and drop links, as _normalize_text_for_nlp does.
+    raw = text
+    if "<Media omitted>" in text:
+        raw = text.replace("<Media omitted>", "")
+        text = text.replace("<Media omitted>", " ")
+    tokens.emojis = emoji_pattern.findall(raw)
+    tokens.raw_words = _basic_word_pattern.findall(raw.lower())
+    tokens.links = 0
+    if "://" in raw:
+        tokens.links = len(link_pattern.findall(raw))
+        if tokens.links:
+            text = link_pattern.sub(" ", text)
+    if text is raw:
+        tokens.words = tokens.raw_words
+    else:
+        tokens.words = _basic_word_pattern.findall(text.lower())
+    return tokens
+
+
 def _sentiment_label(compound: float) -> str:
     if compound >= 0.05:
         return "positive"
@@ -704,40 +1177,237 @@ def _sentiment_label(compound: float) -> str:
 # --- Funciones Auxiliares ---
 
 
-def parse_date(date_str, time_str):
+def _date_parts(date_str, order):
     """
-    Dado un string de fecha y hora, prueba distintos formatos para parsearlo.
-    Se prueban tanto mes/día/año como día/mes/año, con año de 2 o 4 dígitos.
-    Prioriza mes/día/año (formato común en WhatsApp exports).
+    Convierte "a/b/aa(aa)" en (año, mes, día) según el orden dado ("mdy" o
+    "dmy"). Los años de 2 dígitos siguen la regla de %y (69-99 -> 19xx).
+    Retorna None si la fecha no es válida en ese orden.
     """
-    date_time_str = f"{date_str} {time_str}"
-    formatos = [
-        "%m/%d/%y %H:%M",  # US format: month/day/year (2 digits) - priority
-        "%m/%d/%Y %H:%M",  # US format: month/day/year (4 digits)
-        "%d/%m/%y %H:%M",  # EU format: day/month/year (2 digits)
-        "%d/%m/%Y %H:%M",  # EU format: day/month/year (4 digits)
-    ]
-    for fmt in formatos:
+    first, second, year = date_str.split("/")
+    month, day = (first, second) if order == "mdy" else (second, first)
+    year_num = int(year)
+    if len(year) == 2:
+        year_num += 1900 if year_num >= 69 else 2000
+    try:
+        parsed = datetime(year_num, int(month), int(day))
+    except ValueError:
+        return None
+    return parsed.year, parsed.month, parsed.day
+
+
+def detect_date_order(date_strings):
+    """
+    Deduce si un export usa mes/día/año ("mdy") o día/mes/año ("dmy") a partir
+    de una muestra de fechas: un primer campo > 12 sólo puede ser un día y un
+    segundo campo > 12 sólo puede ser un día. Si la muestra es ambigua se
+    mantiene la prioridad histórica de mes/día/año.
+    """
+    for date_str in date_strings:
+        first, second, _ = date_str.split("/")
+        if int(first) > 12:
+            return "dmy"
+        if int(second) > 12:
+            return "mdy"
+    return "mdy"
+
+
+def _parse_time_24h(time_str):
+    """"HH:MM" o "HH:MM:SS" -> (hora, minuto, segundo)."""
+    parts = time_str.split(":")
+    return int(parts[0]), int(parts[1]), int(parts[2]) if len(parts) > 2 else 0
+
+
+_time_12h_pattern = re.compile(r"(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([AaPp])")
+
+
+def _parse_time_12h(time_str):
+    """"h:mm AM", "h:mm:ss p. m.", etc. -> (hora, minuto, segundo) o None."""
+    match = _time_12h_pattern.match(time_str)
+    if not match:
+        return None
+    hour, minute, second, meridiem = match.groups()
+    hour = int(hour)
+    if not 1 <= hour <= 12:
+        return None
+    hour %= 12
+    if meridiem in "Pp":
+        hour += 12
+    return hour, int(minute), int(second or 0)
+
+
+def _build_date_parser(order, parse_time=_parse_time_24h):
+    """
+    Crea un parser de fecha/hora para un orden ya detectado. Las partes de la
+    fecha (y de la hora) se memorizan por string, ya que miles de mensajes
+    comparten la misma fecha. Si una fecha no es válida en el orden detectado
+    se prueba el otro, como hacía el parser original. Retorna None en lugar de
+    lanzar ValueError.
+    """
+    fallback = "dmy" if order == "mdy" else "mdy"
+    date_cache = {}
+    time_cache = {}
+
+    def parse(date_str, time_str):
+        parts = date_cache.get(date_str)
+        if parts is None:
+            parts = (
+                _date_parts(date_str, order)
+                or _date_parts(date_str, fallback)
+                or False
+            )
+            date_cache[date_str] = parts
+        if not parts:
+            return None
+        time_parts = time_cache.get(time_str)
+        if time_parts is None:
+            time_parts = parse_time(time_str) or False
+            time_cache[time_str] = time_parts
+        if not time_parts:
+            return None
         try:
-            return datetime.strptime(date_time_str, fmt)
+            return datetime(parts[0], parts[1], parts[2], *time_parts)
         except ValueError:
-            continue
-    raise ValueError(f"Formato de fecha/hora no reconocido: '{date_time_str}'")
+            return None
 
+    return parse
 
-def should_ignore_message(sender, message):
+
+def parse_date(date_str, time_str, order=None):
     """
-    Devuelve True si el mensaje es de sistema o no se considera conversacional.
-    Se ignoran:
-      - Mensajes cuyo texto sea "null".
-      - Mensajes con avisos típicos de sistema (cifrado, creación de grupo, etc.).
-    Soporta patrones en inglés y español.
+    Dado un string de fecha y hora, lo parsea probando mes/día/año y luego
+    día/mes/año (o primero el orden indicado), con año de 2 o 4 dígitos.
+    Prioriza mes/día/año (formato común en WhatsApp exports).
+    """
+    dt = _build_date_parser(order or "mdy")(date_str, time_str)
+    if dt is None:
+        raise ValueError(
+            f"Formato de fecha/hora no reconocido: '{date_str} {time_str}'"
+        )
+    return dt
+
+
+class ChatDialect:
     """
-    texto = message.strip().lower()
-    ignore_patterns = [
-        # Genéricos
+    Formato de encabezado de un export de WhatsApp.
+
+    `pattern` debe capturar (fecha, hora, resto) sobre una línea completa y
+    `header_bytes` es su equivalente en bytes para el modo mmap, que captura
+    (fecha, hora) y termina donde empieza el resto. `parse_time` convierte la
+    hora capturada en (hora, minuto, segundo).
+    """
+
+    def __init__(self, name, pattern, header_bytes, parse_time):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.header_bytes = re.compile(header_bytes)
+        # Con "\n" inicial el motor de regex salta directo a cada salto de
+        # línea en vez de probar cada posición del mapeo.
+        self.header_bytes_after_newline = re.compile(b"\n" + header_bytes)
+        self.parse_time = parse_time
+
+    def __repr__(self):
+        return f"ChatDialect({self.name!r})"
+
+
+# Dialectos de export conocidos, en orden de prioridad ante empates. Los
+# patrones en bytes sólo admiten espacios horizontales (incluidos NBSP y
+# NNBSP en UTF-8) para no cruzar saltos de línea.
+CHAT_DIALECTS = {}
+
+_DATE_RE = r"(\d{1,2}/\d{1,2}/\d{2,4})"
+_DATE_RE_BYTES = rb"(\d{1,2}/\d{1,2}/\d{2,4})"
+_SPACE_RE_BYTES = rb"(?:[ \t]|\xc2\xa0|\xe2\x80\xaf)"
+_MERIDIEM_RE = r"\s*[AaPp]\.?\s*[Mm]\.?"
+_MERIDIEM_RE_BYTES = _SPACE_RE_BYTES + rb"*[AaPp]\.?" + _SPACE_RE_BYTES + rb"*[Mm]\.?"
+
+
+def register_chat_dialect(dialect):
+    """Agrega (o reemplaza) un dialecto en CHAT_DIALECTS."""
+    CHAT_DIALECTS[dialect.name] = dialect
+    return dialect
+
+
+# Android: "31/12/21, 23:59 - Ana: hola"
+register_chat_dialect(
+    ChatDialect(
+        "android",
+        message_pattern.pattern,
+        _DATE_RE_BYTES + rb",?" + _SPACE_RE_BYTES + rb"+(\d{1,2}:\d{2}) - ",
+        _parse_time_24h,
+    )
+)
+# Android 12 h: "12/31/21, 11:59 PM - Ana: hola" (también "p. m.")
+register_chat_dialect(
+    ChatDialect(
+        "android_12h",
+        r"^" + _DATE_RE + r",?\s+(\d{1,2}:\d{2}" + _MERIDIEM_RE + r") - (.*)$",
+        _DATE_RE_BYTES
+        + rb",?"
+        + _SPACE_RE_BYTES
+        + rb"+(\d{1,2}:\d{2}"
+        + _MERIDIEM_RE_BYTES
+        + rb") - ",
+        _parse_time_12h,
+    )
+)
+# iOS: "[31/12/21, 23:59:30] Ana: hola" (a veces precedido por U+200E)
+register_chat_dialect(
+    ChatDialect(
+        "ios",
+        r"^\u200e?\[" + _DATE_RE + r",?\s+(\d{1,2}:\d{2}:\d{2})\] (.*)$",
+        rb"(?:\xe2\x80\x8e)?\["
+        + _DATE_RE_BYTES
+        + rb",?"
+        + _SPACE_RE_BYTES
+        + rb"+(\d{1,2}:\d{2}:\d{2})\] ",
+        _parse_time_24h,
+    )
+)
+# iOS 12 h: "[12/31/21, 11:59:30 PM] Ana: hola"
+register_chat_dialect(
+    ChatDialect(
+        "ios_12h",
+        r"^\u200e?\["
+        + _DATE_RE
+        + r",?\s+(\d{1,2}:\d{2}:\d{2}"
+        + _MERIDIEM_RE
+        + r")\] (.*)$",
+        rb"(?:\xe2\x80\x8e)?\["
+        + _DATE_RE_BYTES
+        + rb",?"
+        + _SPACE_RE_BYTES
+        + rb"+(\d{1,2}:\d{2}:\d{2}"
+        + _MERIDIEM_RE_BYTES
+        + rb")\] ",
+        _parse_time_12h,
+    )
+)
+
+
+def detect_chat_dialect(lines):
+    """
+    Elige el dialecto cuyo patrón coincide con más líneas de la muestra. Ante
+    empate (o si ninguno coincide) gana el primero registrado (Android).
+    """
+    lines = [line.rstrip("\r\n") for line in lines]
+    best, best_hits = None, -1
+    for dialect in CHAT_DIALECTS.values():
+        hits = sum(1 for line in lines if dialect.pattern.match(line))
+        if hits > best_hits:
+            best, best_hits = dialect, hits
+    return best
+
+
+# Avisos de sistema (cifrado, acciones de grupo, ubicación, contactos...) que
+# no se consideran mensajes conversacionales, agrupados por idioma. Para
+# soportar otro idioma basta con agregar una clave y reconstruir el matcher con
+# set_system_message_locales().
+SYSTEM_MESSAGE_PATTERNS = {
+    "generic": [
         "null",
-        # Inglés - Cifrado y privacidad
+    ],
+    "en": [
+        # Cifrado y privacidad
         "end-to-end encrypted",
         "messages and calls are end-to-end encrypted",
         "only people in this chat can read",
@@ -745,7 +1415,7 @@ def should_ignore_message(sender, message):
         "your security code with",
         "security code changed",
         "tap to learn more",
-        # Inglés - Acciones de grupo
+        # Acciones de grupo
         "created group",
         "added you",
         "added to this group",
@@ -763,7 +1433,13 @@ def should_ignore_message(sender, message):
         "waiting for this message",
         "missed voice call",
         "missed video call",
-        # Español - Cifrado y privacidad
+        # Ubicación y contactos compartidos
+        "location:",
+        "live location",
+        "contact card omitted",
+    ],
+    "es": [
+        # Cifrado y privacidad
         "cifrado de extremo a extremo",
         "los mensajes y las llamadas están cifrados",
         "solo las personas de este chat pueden leer",
@@ -771,7 +1447,7 @@ def should_ignore_message(sender, message):
         "tu código de seguridad con",
         "el código de seguridad cambió",
         "toca para más información",
-        # Español - Acciones de grupo
+        # Acciones de grupo
         "creó el grupo",
         "creó este grupo",
         "te añadió",
@@ -795,37 +1471,336 @@ def should_ignore_message(sender, message):
         "esperando este mensaje",
         "llamada de voz perdida",
         "videollamada perdida",
-        # Mensajes de ubicación
-        "location:",
+        # Ubicación y contactos compartidos
         "ubicación:",
-        "live location",
         "ubicación en tiempo real",
-        # Contactos compartidos
-        "contact card omitted",
         "tarjeta de contacto omitida",
-    ]
-    for pat in ignore_patterns:
-        if pat in texto:
-            return True
-    return False
+    ],
+}
+
+
+def _trie_regex(patterns):
+    """
+    Arma una regex equivalente a la alternancia de `patterns` pero con los
+    prefijos comunes factorizados (un trie), así en cada posición del texto el
+    motor sólo descarta unas pocas ramas en vez de probar todos los patrones.
+    """
+    trie = {}
+    for pat in patterns:
+        node = trie
+        for ch in pat:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        # Para `search` alcanza con encontrar el patrón más corto: si este
+        # nodo termina uno, no hace falta seguir por sus ramas.
+        if "" in node:
+            return ""
+        alternatives = []
+        single_chars = []
+        for ch in sorted(node):
+            sub = build(node[ch])
+            if sub:
+                alternatives.append(re.escape(ch) + sub)
+            else:
+                single_chars.append(re.escape(ch))
+        if len(single_chars) == 1:
+            alternatives.append(single_chars[0])
+        elif single_chars:
+            alternatives.append("[" + "".join(single_chars) + "]")
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return "(?:" + "|".join(alternatives) + ")"
+
+    return build(trie)
+
+
+def build_system_message_matcher(locales=None):
+    """
+    Compila los patrones de SYSTEM_MESSAGE_PATTERNS (todos los idiomas, o sólo
+    los indicados en `locales`) en una única regex (en forma de trie), de modo
+    que filtrar un mensaje sea una sola búsqueda sin importar cuántos patrones
+    haya.
+    """
+    if locales is None:
+        locales = SYSTEM_MESSAGE_PATTERNS.keys()
+    patterns = {
+        pat.lower()
+        for locale in locales
+        for pat in SYSTEM_MESSAGE_PATTERNS.get(locale, ())
+        if pat
+    }
+    if not patterns:
+        # Regex que nunca coincide: no se ignora ningún mensaje.
+        return re.compile(r"(?!)")
+    return re.compile(_trie_regex(patterns))
+
+
+_system_message_matcher = build_system_message_matcher()
+
+
+def set_system_message_locales(locales=None):
+    """Reconstruye el matcher global con los idiomas indicados (None = todos)."""
+    global _system_message_matcher
+    _system_message_matcher = build_system_message_matcher(locales)
+
+
+def should_ignore_message(sender, message):
+    """
+    Devuelve True si el mensaje es de sistema o no se considera conversacional.
+    Se ignoran:
+      - Mensajes cuyo texto sea "null".
+      - Mensajes con avisos típicos de sistema (cifrado, creación de grupo, etc.).
+    Los patrones se definen por idioma en SYSTEM_MESSAGE_PATTERNS.
+    """
+    return _system_message_matcher.search(message.lower()) is not None
+
+
+def _sample_chat_format(lines, dialect=None):
+    """
+    Consume las primeras DIALECT_SAMPLE_LINES líneas para elegir el dialecto
+    (salvo que se indique) y sigue leyendo hasta reunir DATE_SAMPLE_HEADERS
+    encabezados (o el final) para deducir el orden de fecha. Retorna
+    (líneas_leídas, dialecto, orden) para que el llamador re-procese la muestra.
+    """
+    sample = list(islice(lines, DIALECT_SAMPLE_LINES))
+    if dialect is None:
+        dialect = detect_chat_dialect(sample)
+    date_strings = []
+    for line in sample:
+        match = dialect.pattern.match(line.rstrip("\n"))
+        if match:
+            date_strings.append(match.group(1))
+    while len(date_strings) < DATE_SAMPLE_HEADERS:
+        line = next(lines, None)
+        if line is None:
+            break
+        sample.append(line)
+        match = dialect.pattern.match(line.rstrip("\n"))
+        if match:
+            date_strings.append(match.group(1))
+    return sample, dialect, detect_date_order(date_strings)
+
+
+# Origen de los timestamps de MessageTable (fechas "naive", sin zona horaria).
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+_EPOCH_WEEKDAY = _EPOCH.weekday()
+
+
+def _to_epoch_seconds(dt):
+    return (dt - _EPOCH) // timedelta(seconds=1)
 
 
-def _parse_chat_lines(lines_iterable):
-    """Parsea iterables de líneas de chat y retorna la lista de mensajes."""
-    messages = []
+def _from_epoch_seconds(ts):
+    return _EPOCH + timedelta(seconds=ts)
+
+
+class MessageTable(Sequence):
+    """
+    Almacén columnar de mensajes parseados.
+
+    En lugar de un dict por mensaje (con su datetime y su string de remitente)
+    guarda arrays paralelos:
+      - timestamps: segundos desde 1970-01-01 (int64).
+      - sender_ids: índice en `senders` (int32), -1 si no hay remitente.
+      - offsets: límites de cada texto dentro de un único buffer UTF-8.
+      - inversions: filas cuyo timestamp es menor que el de la anterior. Los
+        exports casi siempre vienen en orden, así que suele estar vacío y el
+        análisis usa la tabla tal cual (ver sorted_by_time).
+
+    Como secuencia se comporta como la antigua lista de dicts: indexar o
+    iterar produce dicts {"datetime", "sender", "message"} nuevos, por lo que
+    modificarlos no altera la tabla.
+    """
+
+    def __init__(self):
+        self.timestamps = array("q")
+        self.sender_ids = array("i")
+        self.senders = []
+        self.offsets = array("q", [0])
+        self.inversions = array("q")
+        self._sender_index = {}
+        self._text = bytearray()
+
+    @classmethod
+    def from_dicts(cls, messages):
+        """Construye una tabla a partir de una lista de dicts de mensajes."""
+        table = cls()
+        for msg in messages:
+            table.append(msg["datetime"], msg["sender"], msg["message"])
+        return table
+
+    def append(self, dt, sender, message):
+        self.append_timestamp(_to_epoch_seconds(dt), sender, message)
+
+    def append_timestamp(self, ts, sender, message):
+        self._append_encoded(ts, sender, message.encode("utf-8"))
+
+    def _append_encoded(self, ts, sender, data):
+        timestamps = self.timestamps
+        if timestamps and ts < timestamps[-1]:
+            self.inversions.append(len(timestamps))
+        timestamps.append(ts)
+        self.sender_ids.append(self._sender_id(sender))
+        self._text += data
+        self.offsets.append(len(self._text))
+
+    def extend(self, other):
+        """Agrega al final todas las filas de otra tabla."""
+        remap = [self._sender_id(sender) for sender in other.senders]
+        base = len(self._text)
+        rows = len(self)
+        if rows and other.timestamps and other.timestamps[0] < self.timestamps[-1]:
+            self.inversions.append(rows)
+        self.inversions.extend(array("q", (rows + i for i in other.inversions)))
+        self.timestamps.extend(other.timestamps)
+        self.sender_ids.extend(
+            array("i", (remap[i] if i >= 0 else -1 for i in other.sender_ids))
+        )
+        self._text += other._text
+        self.offsets.extend(array("q", (base + o for o in other.offsets[1:])))
+
+    def _sender_id(self, sender):
+        if sender is None:
+            return -1
+        sender_id = self._sender_index.get(sender)
+        if sender_id is None:
+            sender_id = len(self.senders)
+            self._sender_index[sender] = sender_id
+            self.senders.append(sender)
+        return sender_id
+
+    def sender(self, i):
+        sender_id = self.sender_ids[i]
+        return self.senders[sender_id] if sender_id >= 0 else None
+
+    def text(self, i):
+        return self._text[self.offsets[i] : self.offsets[i + 1]].decode("utf-8")
+
+    def take(self, indices):
+        """Retorna una nueva tabla con las filas indicadas, en ese orden."""
+        table = MessageTable()
+        offsets = self.offsets
+        for i in indices:
+            table._append_encoded(
+                self.timestamps[i],
+                self.sender(i),
+                self._text[offsets[i] : offsets[i + 1]],
+            )
+        return table
+
+    def numpy_columns(self):
+        """
+        Retorna (timestamps, sender_ids) como arrays de NumPy, sin copiar, o
+        None si NumPy no está instalado.
+        """
+        if _load_numpy() is None:
+            return None
+        return (
+            np.frombuffer(self.timestamps, dtype=np.int64),
+            np.frombuffer(self.sender_ids, dtype=np.intc),
+        )
+
+    @property
+    def is_chronological(self):
+        return not self.inversions
+
+    def sorted_by_time(self):
+        """
+        Retorna la tabla ordenada cronológicamente (orden estable). Si ya está
+        en orden retorna la misma tabla, sin copiar: así se puede pasar una
+        tabla ya ordenada a analyze_messages sin pagar el ordenamiento.
+
+        Si no, sólo se reordena el tramo desplazado (p. ej. la hora repetida
+        de un cambio de horario): el prefijo que no supera al menor timestamp
+        posterior y el sufijo que no es superado por ningún timestamp anterior
+        ya están en su lugar y se copian en bloque.
+        """
+        if not self.inversions:
+            return self
+        timestamps = self.timestamps
+        total = len(self)
+        first, last = self.inversions[0], self.inversions[-1]
+        lo = bisect.bisect_right(timestamps, min(timestamps[first:]), 0, first)
+        hi = bisect.bisect_left(timestamps, max(timestamps[:last]), last, total)
+        # El tramo se compone de pocas corridas ordenadas: los sorts estables
+        # (timsort) las fusionan en tiempo casi lineal.
+        if _load_numpy() is not None:
+            middle = np.argsort(self.numpy_columns()[0][lo:hi], kind="stable") + lo
+            middle = middle.tolist()
+        else:
+            middle = sorted(range(lo, hi), key=timestamps.__getitem__)
+
+        table = MessageTable()
+        table.senders = list(self.senders)
+        table._sender_index = dict(self._sender_index)
+        offsets = self.offsets
+        table.timestamps = timestamps[:lo]
+        table.sender_ids = self.sender_ids[:lo]
+        table.offsets = offsets[: lo + 1]
+        table._text = self._text[: offsets[lo]]
+        for i in middle:
+            table._append_encoded(
+                timestamps[i], self.sender(i), self._text[offsets[i] : offsets[i + 1]]
+            )
+        # Las filas [lo, hi) ocupan los mismos bytes que antes: los offsets del
+        # sufijo no cambian.
+        table.timestamps += timestamps[hi:]
+        table.sender_ids += self.sender_ids[hi:]
+        table.offsets += offsets[hi + 1 :]
+        table._text += self._text[offsets[hi] :]
+        return table
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("MessageTable index out of range")
+        return {
+            "datetime": _from_epoch_seconds(self.timestamps[i]),
+            "sender": self.sender(i),
+            "message": self.text(i),
+        }
+
+
+def _parse_chat_lines(lines_iterable, date_order=None, dialect=None):
+    """
+    Parsea iterables de líneas de chat y retorna una MessageTable. El
+    dialecto y el orden de fecha se deducen de las primeras líneas si no se
+    indican; después sólo se usa la regex y el parser de ese dialecto.
+    """
+    messages = MessageTable()
+    # Mensaje pendiente (datetime, remitente, primera línea) y sus líneas de
+    # continuación; se agrega a la tabla una sola vez al llegar el siguiente
+    # encabezado (evita concatenaciones cuadráticas).
     current_message = None
+    continuation = []
+
+    lines_iterable = iter(lines_iterable)
+    if date_order is None or dialect is None:
+        sample, dialect, detected_order = _sample_chat_format(lines_iterable, dialect)
+        date_order = date_order or detected_order
+        lines_iterable = chain(sample, lines_iterable)
+    header_pattern = dialect.pattern
+    parse_datetime = _build_date_parser(date_order, dialect.parse_time)
 
     for line in lines_iterable:
         line = line.rstrip("\n")
         if not line:
             continue
 
-        match = message_pattern.match(line)
+        match = header_pattern.match(line)
         if match:
             date_str, time_str, rest = match.groups()
-            try:
-                dt = parse_date(date_str, time_str)
-            except ValueError:
+            dt = parse_datetime(date_str, time_str)
+            if dt is None:
                 continue
 
             if ": " in rest:
@@ -834,445 +1809,573 @@ def _parse_chat_lines(lines_iterable):
                 sender = None
                 message_text = rest
 
+            if current_message is not None:
+                _flush_message(messages, current_message, continuation)
+                continuation = []
+
             if should_ignore_message(sender, message_text):
                 current_message = None
                 continue
 
-            current_message = {
-                "datetime": dt,
-                "sender": sender,
-                "message": message_text,
-            }
-            messages.append(current_message)
+            current_message = (dt, sender, message_text)
         else:
             if current_message is not None:
-                current_message["message"] += "\n" + line
+                continuation.append(line)
+    if current_message is not None:
+        _flush_message(messages, current_message, continuation)
     return messages
 
 
-def parse_chat(filename):
-    """
-    Lee el archivo de WhatsApp desde disco y retorna la lista de mensajes.
+def _flush_message(messages, current_message, continuation):
+    dt, sender, message_text = current_message
+    if continuation:
+        message_text = "\n".join([message_text, *continuation])
+    messages.append(dt, sender, message_text)
+
+
+def parse_chat(
+    filename,
+    workers=1,
+    parallel_min_bytes=PARALLEL_PARSE_MIN_BYTES,
+    use_mmap=False,
+    since=None,
+):
     """
-    with open(filename, encoding="utf-8") as f:
-        return _parse_chat_lines(f)
+    Lee el archivo de WhatsApp desde disco y retorna los mensajes (MessageTable).
 
+    Con `workers` > 1 (opcional; por defecto se parsea en el mismo proceso) y
+    un archivo de al menos `parallel_min_bytes`, el archivo se divide en rangos
+    de bytes que empiezan siempre en un encabezado de mensaje y se parsean en
+    `workers` procesos. El resultado es idéntico al parseo secuencial.
 
-def parse_chat_stream(stream):
-    """Parsea un chat desde un objeto tipo archivo ya cargado en memoria."""
-    return _parse_chat_lines(stream)
+    Con `use_mmap=True` el archivo se mapea en memoria y se recorre a nivel de
+    bytes (ver _parse_chat_mmap); este modo es secuencial.
 
+    Con `since` (datetime) sólo se garantizan los mensajes desde esa fecha:
+    se ubica por bisección un encabezado algo anterior y se parsea sólo la
+    cola del archivo (pueden venir algunos mensajes previos, ver
+    AnalysisState.update). Se usa para re-analizar un export más nuevo.
 
-def format_duration(td):
+    La codificación se detecta sobre el inicio del archivo (detect_encoding).
+    Los modos mmap, multiproceso y `since` sólo aplican a archivos UTF-8 sin
+    BOM; con otras codificaciones se parsea el archivo completo.
     """
-    Formatea un timedelta para mostrarlo en minutos o en horas con un decimal.
-    """
-    total_seconds = td.total_seconds()
-    if total_seconds < 3600:
-        minutos = total_seconds / 60
-        return f"{minutos:.1f} min"
-    else:
-        horas = total_seconds / 3600
-        return f"{horas:.1f} hs"
+    with open(filename, "rb") as f:
+        encoding = detect_encoding(f.read(ENCODING_SNIFF_BYTES))
+    if encoding == "utf-8":
+        if since is not None:
+            return _parse_chat_since(filename, since)
+        if use_mmap:
+            return _parse_chat_mmap(filename)
+        if workers > 1 and os.path.getsize(filename) >= parallel_min_bytes:
+            return _parse_chat_parallel(filename, workers)
+    with open(filename, encoding=encoding, errors="replace") as f:
+        return _parse_chat_lines(f)
 
 
-def analyze_messages(messages):
+def _parse_chat_mmap(filename):
     """
-    A partir de la lista de mensajes filtrados, calcula las estadísticas:
-      - Estadísticas generales: total de mensajes, participantes, mensajes por persona.
-      - Actividad: mensajes por día, por hora (de 00 a 23), por día de la semana,
-                   y la hora, día y persona más activos.
-      - Texto y Multimedia: palabras promedio por mensaje, palabras más utilizadas,
-                            total de multimedia y links.
-      - Emojis: total de emojis, ranking de emojis global y por persona (solo top 10).
-      - Conversaciones: iniciadores y tiempo promedio de conversación (segmentadas con gap de 2 horas).
-      - Racha conversacional más larga (días consecutivos) con inicio y fin.
+    Parsea el archivo mapeándolo en memoria. Los encabezados se buscan con
+    una regex de bytes sobre el mapeo y sólo se decodifica el cuerpo de cada
+    mensaje: los mensajes de sistema se descartan tras decodificar su primera
+    línea, sin crear strings para sus líneas de continuación.
     """
-    stats = {}
-
-    # Ordenar mensajes por fecha para segmentar adecuadamente las conversaciones
-    messages = sorted(messages, key=lambda m: m["datetime"])
-    total_messages = len(messages)
-    stats["total_mensajes"] = total_messages
-
-    participantes = set()
-    mensajes_por_persona = defaultdict(int)
-    palabras_por_persona = defaultdict(int)  # Total de palabras por persona
-    mensajes_count_persona = defaultdict(int)  # Para calcular promedio
-    multimedia_count = 0
-    total_emojis = 0
-    total_links = 0
-    palabras_counter_raw = Counter()
-    palabras_counter_nlp = Counter()
-    emojis_counter = Counter()
-    mensajes_por_dia = defaultdict(int)
-    mensajes_por_hora = defaultdict(int)  # Contaremos por hora (0-23)
-    mensajes_por_dia_semana = defaultdict(int)
-    total_palabras = 0
-
-    # Emojis por persona
-    emojis_por_persona = defaultdict(Counter)
-
-    # Lapso global
-    if messages:
-        inicio_global = messages[0]["datetime"]
-        fin_global = messages[-1]["datetime"]
-        lapso = fin_global - inicio_global
-    else:
-        inicio_global = fin_global = lapso = None
-
-    dias_semana = {
-        0: "Lunes",
-        1: "Martes",
-        2: "Miércoles",
-        3: "Jueves",
-        4: "Viernes",
-        5: "Sábado",
-        6: "Domingo",
-    }
+    messages = MessageTable()
+    with open(filename, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return messages
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # El escaneo vive en su propia función para que los objetos match
+            # (que referencian el mapeo) se liberen antes de cerrarlo.
+            _scan_mmap_messages(mm, messages)
+    return messages
 
-    # --- NLP/Sentiment setup (done once; used during the main loop) ---
-    stop_en = set(_basic_stopwords_en())
-    stop_es = set(_basic_stopwords_es())
 
-    if spacy is not None:
-        try:
-            from spacy.lang.en.stop_words import STOP_WORDS as SPACY_STOP_EN  # type: ignore
+def _iter_mmap_headers(mm, dialect):
+    """Produce (inicio_de_línea, fin_del_encabezado, fecha, hora) por encabezado."""
+    match = dialect.header_bytes.match(mm)
+    if match:
+        yield 0, match.end(), match.group(1), match.group(2)
+    for match in dialect.header_bytes_after_newline.finditer(mm):
+        yield match.start() + 1, match.end(), match.group(1), match.group(2)
+
+
+def _scan_mmap_messages(mm, messages):
+    # El dialecto se elige sobre las primeras líneas, decodificando sólo ese
+    # prefijo del mapeo.
+    head = mm[: 256 * DIALECT_SAMPLE_LINES].decode("utf-8", errors="replace")
+    dialect = detect_chat_dialect(head.split("\n")[:DIALECT_SAMPLE_LINES])
+    sample = islice(_iter_mmap_headers(mm, dialect), DATE_SAMPLE_HEADERS)
+    date_order = detect_date_order(header[2].decode("ascii") for header in sample)
+    parse_datetime = _build_date_parser(date_order, dialect.parse_time)
+
+    # Mensaje en curso: su datetime y los rangos de bytes de su cuerpo
+    # (primera línea tras el encabezado + líneas de continuación).
+    current_dt = None
+    pieces = []
+    piece_start = 0
+    headers = _iter_mmap_headers(mm, dialect)
+    for line_start, header_end, date_bytes, time_bytes in headers:
+        dt = parse_datetime(date_bytes.decode("ascii"), time_bytes.decode("utf-8"))
+        if dt is None:
+            # Encabezado con fecha inválida: se descarta la línea pero el
+            # mensaje en curso continúa después de ella.
+            if current_dt is not None:
+                pieces.append((piece_start, line_start))
+                line_end = mm.find(b"\n", header_end)
+                piece_start = len(mm) if line_end < 0 else line_end + 1
+            continue
+        if current_dt is not None:
+            pieces.append((piece_start, line_start))
+            _flush_mmap_message(messages, mm, current_dt, pieces)
+        current_dt = dt
+        pieces = []
+        piece_start = header_end
+    if current_dt is not None:
+        pieces.append((piece_start, len(mm)))
+        _flush_mmap_message(messages, mm, current_dt, pieces)
+
+
+def _flush_mmap_message(messages, mm, dt, pieces):
+    body = b"".join(mm[start:end] for start, end in pieces)
+    first_end = body.find(b"\n")
+    if first_end < 0:
+        first_end = len(body)
+    rest = body[:first_end].decode("utf-8", errors="replace").rstrip("\r")
+
+    if ": " in rest:
+        sender, message_text = rest.split(": ", 1)
+    else:
+        sender = None
+        message_text = rest
+    if should_ignore_message(sender, message_text):
+        return
+
+    continuation = body[first_end + 1 :]
+    if continuation:
+        lines = [
+            line[:-1] if line.endswith("\r") else line
+            for line in continuation.decode("utf-8", errors="replace").split("\n")
+        ]
+        message_text = "\n".join([message_text, *(line for line in lines if line)])
+    messages.append(dt, sender, message_text)
 
-            stop_en |= set(SPACY_STOP_EN)
-        except Exception:
-            pass
-        try:
-            from spacy.lang.es.stop_words import STOP_WORDS as SPACY_STOP_ES  # type: ignore
 
-            stop_es |= set(SPACY_STOP_ES)
-        except Exception:
-            pass
+def _next_header(f, offset, dialect, parse_datetime):
+    """
+    Busca la primera línea de encabezado con fecha válida que empiece en
+    `offset` o después. Retorna (posición, datetime), o (None, None) si no
+    hay ninguna antes del final del archivo.
+    """
+    f.seek(offset)
+    if offset:
+        f.readline()  # Descartar la línea parcial
+    while True:
+        pos = f.tell()
+        raw = f.readline()
+        if not raw:
+            return None, None
+        line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+        match = dialect.pattern.match(line)
+        if match:
+            dt = parse_datetime(*match.groups()[:2])
+            if dt is not None:
+                return pos, dt
 
-    nlp_en = _get_spacy_nlp("en")
-    nlp_es = _get_spacy_nlp("es")
-    use_spacy = (nlp_en is not None) or (nlp_es is not None)
-    grouped_texts = {"en": [], "es": []} if use_spacy else None
 
-    vader = _get_vader()
-    sent_sum_by_persona = defaultdict(float)
-    sent_count_by_persona = defaultdict(int)
-    sent_counts_by_persona = defaultdict(
-        lambda: {"positive": 0, "neutral": 0, "negative": 0}
+def _find_chunk_boundaries(filename, n_chunks, date_order, dialect):
+    """
+    Calcula offsets de inicio para `n_chunks` rangos del archivo. Cada offset
+    (salvo el 0) apunta al comienzo de una línea de encabezado con fecha
+    válida, de modo que ningún mensaje (ni sus líneas de continuación) quede
+    partido entre dos rangos.
+    """
+    size = os.path.getsize(filename)
+    parse_datetime = _build_date_parser(date_order, dialect.parse_time)
+    boundaries = [0]
+    with open(filename, "rb") as f:
+        for k in range(1, n_chunks):
+            target = max(size * k // n_chunks, boundaries[-1])
+            pos, _ = _next_header(f, target, dialect, parse_datetime)
+            if pos is None:
+                pos = size
+            if pos > boundaries[-1]:
+                boundaries.append(pos)
+    boundaries.append(size)
+    return boundaries
+
+
+def _find_tail_offset(filename, since, date_order, dialect):
+    """
+    Busca por bisección sobre los offsets del archivo un encabezado anterior
+    a `since` (con un margen de TAIL_SEARCH_MARGIN, por si el export no está
+    perfectamente ordenado) y lo más cercano posible a él. Parsear desde ahí
+    cubre todos los mensajes desde `since` leyendo sólo la cola del archivo.
+    """
+    threshold = since - TAIL_SEARCH_MARGIN
+    parse_datetime = _build_date_parser(date_order, dialect.parse_time)
+    lo, hi = 0, os.path.getsize(filename)
+    with open(filename, "rb") as f:
+        while hi - lo > STREAM_CHUNK_SIZE:
+            mid = (lo + hi) // 2
+            pos, dt = _next_header(f, mid, dialect, parse_datetime)
+            if pos is None or dt >= threshold:
+                hi = mid
+            else:
+                lo = pos
+    return lo
+
+
+def _parse_byte_range(filename, start, end, date_order, dialect):
+    """Parsea sólo el rango [start, end) del archivo (usado por los workers)."""
+    with open(filename, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8", errors="replace")
+    return _parse_chat_lines(text, date_order=date_order, dialect=dialect)
+
+
+def _parse_chat_parallel(filename, workers):
+    # El dialecto y el orden de fecha se deducen sobre el inicio del archivo
+    # completo, igual que en el parseo secuencial, y se comparten con todos
+    # los workers.
+    with open(filename, encoding="utf-8", errors="replace") as f:
+        _, dialect, date_order = _sample_chat_format(f)
+
+    boundaries = _find_chunk_boundaries(filename, workers, date_order, dialect)
+    starts, ends = boundaries[:-1], boundaries[1:]
+    messages = MessageTable()
+    with ProcessPoolExecutor(max_workers=len(starts)) as executor:
+        for part in executor.map(
+            _parse_byte_range,
+            repeat(filename),
+            starts,
+            ends,
+            repeat(date_order),
+            repeat(dialect),
+        ):
+            messages.extend(part)
+    return messages
+
+
+def _parse_chat_since(filename, since):
+    # Igual que en el parseo multiproceso, el formato se deduce sobre el
+    # inicio del archivo completo.
+    with open(filename, encoding="utf-8", errors="replace") as f:
+        _, dialect, date_order = _sample_chat_format(f)
+    start = _find_tail_offset(filename, since, date_order, dialect)
+    return _parse_byte_range(
+        filename, start, os.path.getsize(filename), date_order, dialect
     )
-    sent_sum_by_day = defaultdict(float)
-    sent_count_by_day = defaultdict(int)
-    sent_global_counts = {"positive": 0, "neutral": 0, "negative": 0}
-    sent_global_sum = 0.0
-    sent_global_n = 0
-
-    # Estadísticas básicas
-    for msg in messages:
-        dt = msg["datetime"]
-        dia = dt.date().isoformat()
-        mensajes_por_dia[dia] += 1
-
-        mensajes_por_hora[dt.hour] += 1
-
-        weekday = dias_semana[dt.weekday()]
-        mensajes_por_dia_semana[weekday] += 1
-
-        if msg["sender"] is not None:
-            participantes.add(msg["sender"])
-            mensajes_por_persona[msg["sender"]] += 1
-
-        texto = msg["message"]
-        if "<Media omitted>" in texto:
-            multimedia_count += 1
-            texto = texto.replace("<Media omitted>", "")
-
-        links = link_pattern.findall(texto)
-        total_links += len(links)
-
-        emojis_en_msg = emoji_pattern.findall(texto)
-        total_emojis += len(emojis_en_msg)
-        for em in emojis_en_msg:
-            emojis_counter[em] += 1
-            if msg["sender"] is not None:
-                emojis_por_persona[msg["sender"]][em] += 1
-
-        palabras = re.findall(r"\b\w+\b", texto.lower())
-        palabras_en_msg = len(palabras)
-        total_palabras += palabras_en_msg
-        palabras_counter_raw.update(palabras)
 
-        # Contar palabras por persona
-        if msg["sender"] is not None:
-            palabras_por_persona[msg["sender"]] += palabras_en_msg
-            mensajes_count_persona[msg["sender"]] += 1
 
-        # NLP/sentiment text (normalized once)
-        normalized = _normalize_text_for_nlp(msg["message"])
-        lang = _detect_lang_fast(normalized, stop_en, stop_es)
+def parse_chat_stream(stream):
+    """Parsea un chat desde un objeto tipo archivo ya cargado en memoria."""
+    return _parse_chat_lines(stream)
 
-        # Lemma/stopword word frequencies
-        if grouped_texts is not None:
-            grouped_texts[lang].append(normalized)
-        else:
-            # Fallback mode (no spaCy models): tokenize + stopwords inline
-            primary = stop_en if lang == "en" else stop_es
-            secondary = stop_es if lang == "en" else stop_en
-            for w in _basic_word_pattern.findall(normalized.lower()):
-                if len(w) < 2:
-                    continue
-                if w.isdigit():
-                    continue
-                if w in primary or w in secondary:
-                    continue
-                palabras_counter_nlp[w] += 1
 
-        # Sentiment (VADER) in-stream
-        sender = msg.get("sender")
-        if vader is not None and sender:
-            text = normalized.strip()
-            if text:
-                compound = float(vader.polarity_scores(text).get("compound", 0.0))
-                label = _sentiment_label(compound)
-
-                sent_sum_by_persona[sender] += compound
-                sent_count_by_persona[sender] += 1
-                sent_counts_by_persona[sender][label] += 1
-
-                day = dt.date().isoformat()
-                sent_sum_by_day[day] += compound
-                sent_count_by_day[day] += 1
-
-                sent_global_sum += compound
-                sent_global_n += 1
-                sent_global_counts[label] += 1
-
-    palabras_promedio = total_palabras / total_messages if total_messages > 0 else 0
-
-    # --- NLP: stopwords + lemmatization (spaCy if available) ---
-    def _consume_spacy_texts(nlp, texts, stop_primary: set, stop_secondary: set):
-        if not texts:
-            return
-        if nlp is None:
-            # If one language model isn't available, fallback to basic tokenization.
-            for t in texts:
-                for w in _basic_word_pattern.findall((t or "").lower()):
-                    if len(w) < 2:
-                        continue
-                    if w.isdigit():
-                        continue
-                    if w in stop_primary or w in stop_secondary:
-                        continue
-                    palabras_counter_nlp[w] += 1
+def _iter_decoded_lines(
+    stream, encoding="utf-8", chunk_size=STREAM_CHUNK_SIZE, prefix=b"", errors="strict"
+):
+    """
+    Lee un stream binario por bloques y produce sus líneas ya decodificadas.
+    Usa un decodificador incremental, así nunca se mantiene en memoria más que
+    un bloque y la línea incompleta pendiente. Acepta finales de línea LF y CRLF.
+    `prefix` son bytes ya leídos del stream que se decodifican primero.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    pending = ""
+    chunk = prefix
+    while True:
+        chunk = chunk or stream.read(chunk_size)
+        final = not chunk
+        text = pending + decoder.decode(chunk or b"", final=final)
+        lines = text.split("\n")
+        pending = "" if final else lines.pop()
+        for line in lines:
+            yield line[:-1] if line.endswith("\r") else line
+        if final:
             return
+        chunk = None
 
-        for doc in nlp.pipe(texts, batch_size=256):
-            for tok in doc:
-                if tok.is_space or tok.is_punct:
-                    continue
-                if not tok.is_alpha:
-                    continue
-                lemma = (tok.lemma_ or tok.text).lower().strip()
-                if not lemma or lemma == "-pron-":
-                    lemma = tok.text.lower().strip()
-                if len(lemma) < 2:
-                    continue
-                if lemma in stop_primary or lemma in stop_secondary:
-                    continue
-                palabras_counter_nlp[lemma] += 1
-
-    if grouped_texts is not None:
-        # Use both stopword sets regardless of detected language for bilingual chats.
-        _consume_spacy_texts(nlp_en, grouped_texts.get("en", []), stop_en, stop_es)
-        _consume_spacy_texts(nlp_es, grouped_texts.get("es", []), stop_es, stop_en)
-
-    sentimiento_por_persona = {}
-    for persona in participantes:
-        n = sent_count_by_persona.get(persona, 0)
-        avg = (sent_sum_by_persona.get(persona, 0.0) / n) if n else 0.0
-        counts = sent_counts_by_persona.get(
-            persona, {"positive": 0, "neutral": 0, "negative": 0}
-        )
-        sentimiento_por_persona[persona] = {
-            "promedio_compound": round(avg, 4),
-            "positive": int(counts.get("positive", 0)),
-            "neutral": int(counts.get("neutral", 0)),
-            "negative": int(counts.get("negative", 0)),
-            "total": int(n),
-        }
 
-    sentimiento_por_dia = {}
-    for day, n in sent_count_by_day.items():
-        if n:
-            sentimiento_por_dia[day] = round(sent_sum_by_day[day] / n, 4)
+def parse_chat_binary(stream, encoding=None):
+    """
+    Parsea un chat directamente desde un stream binario (p. ej. la subida de
+    Werkzeug) sin leerlo ni decodificarlo completo en memoria.
 
-    sentimiento_global = {
-        "promedio_compound": (
-            round((sent_global_sum / sent_global_n), 4) if sent_global_n else 0.0
-        ),
-        "positive": int(sent_global_counts["positive"]),
-        "neutral": int(sent_global_counts["neutral"]),
-        "negative": int(sent_global_counts["negative"]),
-        "total": int(sent_global_n),
-        "engine": "vader" if vader is not None else "disabled",
-        "coverage": {
-            "scored_messages": int(sent_global_n),
-            "total_messages": int(total_messages),
-            "scored_pct": (
-                round((sent_global_n / total_messages) * 100, 1)
-                if total_messages
-                else 0.0
-            ),
-        },
-    }
+    La codificación se decide una sola vez sobre los primeros
+    ENCODING_SNIFF_BYTES (ver detect_encoding) y el resto se decodifica en
+    una única pasada; un byte inválido más adelante se reemplaza por U+FFFD
+    en vez de forzar una segunda decodificación completa.
+    """
+    prefix = stream.read(ENCODING_SNIFF_BYTES)
+    encoding = encoding or detect_encoding(prefix)
+    lines = _iter_decoded_lines(stream, encoding, prefix=prefix, errors="replace")
+    return _parse_chat_lines(lines)
+
+
+class _SizeLimitedReader:
+    """Envuelve un stream binario y falla si se leen más de `max_bytes`."""
+
+    def __init__(self, stream, max_bytes):
+        self._stream = stream
+        self._max_bytes = max_bytes
+        self._read = 0
+
+    def read(self, size=-1):
+        data = self._stream.read(size)
+        self._read += len(data)
+        if self._read > self._max_bytes:
+            raise ValueError(
+                f"El chat descomprimido supera el máximo de {self._max_bytes} bytes"
+            )
+        return data
 
-    # Aseguramos keys de "00" a "23" para mensajes por hora
-    mensajes_por_hora_formateado = {
-        f"{h:02d}": mensajes_por_hora.get(h, 0) for h in range(24)
-    }
 
-    # Hora, día de la semana y persona más activos
-    if mensajes_por_hora:
-        hora_mas_activa = max(mensajes_por_hora, key=mensajes_por_hora.get)
-        hora_mas_activa_cant = mensajes_por_hora[hora_mas_activa]
-    else:
-        hora_mas_activa = None
-        hora_mas_activa_cant = 0
+def _limit_size(stream, max_bytes):
+    return stream if max_bytes is None else _SizeLimitedReader(stream, max_bytes)
 
-    if mensajes_por_dia_semana:
-        dia_semana_mas_activo = max(
-            mensajes_por_dia_semana, key=mensajes_por_dia_semana.get
-        )
-        dia_semana_mas_activo_cant = mensajes_por_dia_semana[dia_semana_mas_activo]
-    else:
-        dia_semana_mas_activo = None
-        dia_semana_mas_activo_cant = 0
 
-    if mensajes_por_persona:
-        persona_mas_activa = max(mensajes_por_persona, key=mensajes_por_persona.get)
-        persona_mas_activa_cant = mensajes_por_persona[persona_mas_activa]
-    else:
-        persona_mas_activa = None
-        persona_mas_activa_cant = 0
-
-    # Conversaciones: segmentación usando gap de 2 horas
-    conversaciones = []
-    if messages:
-        conv_iniciador = messages[0]["sender"]
-        conv_inicio = messages[0]["datetime"]
-        conv_fin = messages[0]["datetime"]
-        prev_dt = messages[0]["datetime"]
-        for msg in messages[1:]:
-            dt = msg["datetime"]
-            if (dt - prev_dt) < timedelta(hours=2):
-                conv_fin = dt
-            else:
-                duracion = conv_fin - conv_inicio
-                if duracion.total_seconds() > 0:
-                    conversaciones.append(
-                        {
-                            "inicio": conv_inicio,
-                            "fin": conv_fin,
-                            "duracion": duracion,
-                            "iniciador": conv_iniciador,
-                        }
+def _find_chat_member(zf):
+    """
+    Elige el .txt del chat dentro de un export .zip: "_chat.txt" (iOS) o, si
+    no existe, el primer .txt (Android: "WhatsApp Chat with ....txt").
+    """
+    txt_members = [
+        info
+        for info in zf.infolist()
+        if not info.is_dir() and info.filename.lower().endswith(".txt")
+    ]
+    for info in txt_members:
+        if os.path.basename(info.filename) == "_chat.txt":
+            return info
+    if txt_members:
+        return txt_members[0]
+    raise ValueError("El .zip no contiene ningún archivo de chat .txt")
+
+
+@contextmanager
+def open_chat_export(stream, filename, max_bytes=None):
+    """
+    Abre un export de chat como stream binario del texto, descomprimiendo al
+    vuelo los .gz y el .txt del chat dentro de los .zip (los archivos
+    multimedia del .zip nunca se leen). Los .txt se devuelven tal cual.
+    `max_bytes` limita el tamaño del texto descomprimido.
+    """
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    try:
+        if extension == "zip":
+            with zipfile.ZipFile(stream) as zf:
+                member = _find_chat_member(zf)
+                if max_bytes is not None and member.file_size > max_bytes:
+                    raise ValueError(
+                        f"El chat descomprimido supera el máximo de {max_bytes} bytes"
                     )
-                conv_iniciador = msg["sender"]
-                conv_inicio = dt
-                conv_fin = dt
-            prev_dt = dt
-        duracion = conv_fin - conv_inicio
-        if duracion.total_seconds() > 0:
-            conversaciones.append(
-                {
-                    "inicio": conv_inicio,
-                    "fin": conv_fin,
-                    "duracion": duracion,
-                    "iniciador": conv_iniciador,
-                }
-            )
+                with zf.open(member) as chat:
+                    yield _limit_size(chat, max_bytes)
+        elif extension == "gz":
+            with gzip.GzipFile(fileobj=stream, mode="rb") as chat:
+                yield _limit_size(chat, max_bytes)
+        else:
+            yield stream
+    except (zipfile.BadZipFile, gzip.BadGzipFile, zlib.error, EOFError) as e:
+        raise ValueError(f"Archivo comprimido inválido: {e}") from e
 
-    # Sólo considerar conversaciones con duración > 0
-    conversaciones_validas = [
-        c for c in conversaciones if c["duracion"].total_seconds() > 0
-    ]
-    if conversaciones_validas:
-        duraciones = [
-            conv["duracion"].total_seconds() for conv in conversaciones_validas
-        ]
-        promedio_segundos = sum(duraciones) / len(duraciones)
-        promedio_duracion = format_duration(timedelta(seconds=promedio_segundos))
-        # Calcular horas totales "desperdiciadas" chateando
-        total_horas_chat = sum(duraciones) / 3600
+
+def parse_chat_export(stream, filename, max_bytes=None):
+    """Parsea un export .txt, .zip o .gz desde un stream binario."""
+    with open_chat_export(stream, filename, max_bytes) as chat:
+        return parse_chat_binary(chat)
+
+
+def format_duration(td):
+    """
+    Formatea un timedelta para mostrarlo en minutos o en horas con un decimal.
+    """
+    total_seconds = td.total_seconds()
+    if total_seconds < 3600:
+        minutos = total_seconds / 60
+        return f"{minutos:.1f} min"
     else:
-        promedio_duracion = "0 min"
-        total_horas_chat = 0
-
-    # Iniciadores de conversaciones y porcentajes
-    iniciadores = Counter()
-    for conv in conversaciones_validas:
-        if conv["iniciador"]:
-            iniciadores[conv["iniciador"]] += 1
-    total_conversaciones = len(conversaciones_validas)
-    iniciadores_porcentajes = {
-        persona: f"{(count / total_conversaciones * 100):.1f}%"
-        for persona, count in iniciadores.items()
-    }
+        horas = total_seconds / 3600
+        return f"{horas:.1f} hs"
 
-    # Podio de iniciadores (ordenado de mayor a menor)
-    podio_iniciadores = iniciadores.most_common()
-
-    # Calcular tiempo de respuesta promedio por persona
-    # Solo consideramos respuestas dentro de una conversación activa (gap < 2 horas)
-    tiempos_respuesta_por_persona = defaultdict(list)
-
-    if len(messages) > 1:
-        prev_msg = messages[0]
-        for msg in messages[1:]:
-            dt = msg["datetime"]
-            prev_dt = prev_msg["datetime"]
-            gap = (dt - prev_dt).total_seconds()
-
-            # Solo contar como respuesta si:
-            # 1. El gap es menor a 2 horas (misma conversación)
-            # 2. Es de una persona diferente (es una respuesta, no continuación)
-            # 3. El gap es mayor a 5 segundos (evitar mensajes muy seguidos)
-            if gap < 7200 and gap > 5 and msg["sender"] and prev_msg["sender"]:
-                if msg["sender"] != prev_msg["sender"]:
-                    tiempos_respuesta_por_persona[msg["sender"]].append(gap)
-
-            prev_msg = msg
-
-    # Calcular promedio de tiempo de respuesta por persona
-    promedio_respuesta_por_persona = {}
-    for persona, tiempos in tiempos_respuesta_por_persona.items():
-        if tiempos:
-            promedio_seg = sum(tiempos) / len(tiempos)
-            promedio_respuesta_por_persona[persona] = {
-                "promedio_segundos": promedio_seg,
-                "promedio_formateado": format_duration(timedelta(seconds=promedio_seg)),
-                "total_respuestas": len(tiempos),
-            }
 
-    # Calcular promedio de palabras por mensaje por persona
-    palabras_promedio_por_persona = {}
-    for persona in participantes:
-        if mensajes_count_persona[persona] > 0:
-            promedio = palabras_por_persona[persona] / mensajes_count_persona[persona]
-            palabras_promedio_por_persona[persona] = round(promedio, 1)
-        else:
-            palabras_promedio_por_persona[persona] = 0
+DIAS_SEMANA = {
+    0: "Lunes",
+    1: "Martes",
+    2: "Miércoles",
+    3: "Jueves",
+    4: "Viernes",
+    5: "Sábado",
+    6: "Domingo",
+}
+
+# Orden de las claves en el resultado final de analyze_messages.
+STATS_KEYS = (
+    # Estadísticas generales
+    "total_mensajes",
+    "participantes",
+    "mensajes_por_persona",
+    "persona_mas_activa",
+    # Actividad
+    "mensajes_por_dia",
+    "mensajes_por_hora",
+    "dia_semana_mas_activo",
+    "mensajes_promedio_por_dia",
+    "dias_activos",
+    # Texto y Multimedia
+    "palabras_promedio_por_mensaje",
+    "palabras_promedio_por_persona",
+    "palabras_mas_utilizadas_raw",
+    "palabras_mas_utilizadas_nlp",
+    "palabras_mas_utilizadas",
+    "total_multimedia",
+    "total_links",
+    # Sentiment
+    "sentimiento_por_persona",
+    "sentimiento_por_dia",
+    "sentimiento_global",
+    # Emojis
+    "total_emojis",
+    "emojis_mas_utilizados",
+    "emojis_por_persona",
+    # Conversaciones
+    "iniciadores_de_conversacion",
+    "tiempo_promedio_conversacion",
+    "tiempo_respuesta_por_persona",
+    "horas_totales_chat",
+    "lapso_tiempo",
+    "racha_conversacional",
+    # NLP/Analysis metadata - informa qué funcionalidades están activas
+    "nlp_info",
+)
+
+
+class MessageContext:
+    """
+    Vista de un mensaje que se pasa a cada acumulador en el loop principal.
+    Los valores derivados (día ISO, tokens, texto normalizado para NLP) se
+    calculan a demanda una sola vez y se comparten entre todos
+    los acumuladores.
+    """
+
+    __slots__ = (
+        "timestamp",
+        "day_index",
+        "sender",
+        "text",
+        "_days",
+        "_normalized",
+        "_tokens",
+    )
 
-    # Racha conversacional: días consecutivos (usando toordinal)
-    fechas = sorted({msg["datetime"].date() for msg in messages})
-    dias_activos = len(fechas)  # Días con al menos un mensaje
+    def __init__(self):
+        # Fecha ISO por día (días desde 1970-01-01), calculada una vez por día
+        self._days = {}
+
+    def reset(self, timestamp, sender, text):
+        self.timestamp = timestamp
+        self.day_index = timestamp // 86400
+        self.sender = sender
+        self.text = text
+        self._normalized = None
+        self._tokens = None
+
+    @property
+    def day(self):
+        day = self._days.get(self.day_index)
+        if day is None:
+            day = date.fromordinal(_EPOCH_ORDINAL + self.day_index).isoformat()
+            self._days[self.day_index] = day
+        return day
+
+    @property
+    def hour(self):
+        return self.timestamp // 3600 % 24
+
+    @property
+    def weekday(self):
+        return (self.day_index + _EPOCH_WEEKDAY) % 7
+
+    @property
+    def has_media(self):
+        return "<Media omitted>" in self.text
+
+    @property
+    def normalized(self):
+        """Texto para NLP/sentimiento: sin multimedia ni links."""
+        if self._normalized is None:
+            self._normalized = _normalize_text_for_nlp(self.text)
+        return self._normalized
+
+    @property
+    def tokens(self):
+        """Palabras, emojis y links del mensaje (ver tokenize), en una sola pasada."""
+        if self._tokens is None:
+            self._tokens = tokenize(self.text)
+        return self._tokens
+
+
+def _merge_counts(target, source):
+    """Suma los conteos de `source` en `target` (las claves nuevas van al final)."""
+    for key, count in source.items():
+        target[key] += count
+
+
+def _sentiment_counts():
+    return {"positive": 0, "neutral": 0, "negative": 0}
+
+
+def _first_seen_counts(values):
+    """
+    Pares (valor, cantidad) de un array de NumPy de enteros chicos no
+    negativos (ids de remitente), en orden de primera aparición.
+    """
+    if not len(values):
+        return []
+    counts = np.bincount(values)
+    first = np.full(len(counts), len(values))
+    np.minimum.at(first, values, np.arange(len(values)))
+    present = np.flatnonzero(counts)
+    order = present[np.argsort(first[present], kind="stable")]
+    return zip(order.tolist(), counts[order].tolist())
+
+
+def _truthy_senders(sender_ids, senders):
+    """Máscara de los mensajes con remitente no vacío (sender_ids -1 = sin remitente)."""
+    valid = np.array([bool(sender) for sender in senders] + [False], dtype=bool)
+    return valid[sender_ids]
+
+
+def _sender_name(senders, sender_id):
+    return senders[sender_id] if sender_id >= 0 else None
+
+
+def _longest_day_run(fechas):
+    """
+    Inicio y fin (días desde 1970-01-01) de la racha más larga de días
+    consecutivos en `fechas` (ordenadas, sin repetidos); ante un empate gana
+    la primera. Retorna (None, None) si no hay fechas.
+    """
+    if not fechas:
+        return None, None
+    if _load_numpy() is not None:
+        dias = np.array(fechas, dtype=np.int64)
+        cortes = np.flatnonzero(np.diff(dias) > 1)
+        inicios = np.concatenate(([0], cortes + 1))
+        fines = np.append(cortes, len(dias) - 1)
+        mayor = int(np.argmax(fines - inicios))
+        return int(dias[inicios[mayor]]), int(dias[fines[mayor]])
 
     longest_streak = 0
     current_streak = 1
     streak_start = streak_end = None
-    temp_start = fechas[0] if fechas else None
+    temp_start = fechas[0]
     for i in range(1, len(fechas)):
         # Permitir racha si la diferencia es 0 (mismo día) o 1 (día siguiente)
-        if (fechas[i] - fechas[i - 1]).days <= 1:
+        if (fechas[i] - fechas[i - 1]) <= 1:
             current_streak += 1
         else:
             if current_streak > longest_streak:
@@ -1281,124 +2384,1411 @@ def analyze_messages(messages):
                 streak_end = fechas[i - 1]
             current_streak = 1
             temp_start = fechas[i]
-    if fechas:
-        if current_streak > longest_streak:
-            longest_streak = current_streak
-            streak_start = temp_start
-            streak_end = fechas[-1]
-    if streak_start and streak_end:
-        racha_dias = (streak_end - streak_start).days + 1
+    if current_streak > longest_streak:
+        streak_start = temp_start
+        streak_end = fechas[-1]
+    return streak_start, streak_end
+
+
+def _state_to_json(value):
+    if isinstance(value, set):
+        return sorted(value)
+    if isinstance(value, dict):
+        return {key: _state_to_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_state_to_json(item) for item in value]
+    return value
+
+
+class _Items:
+    """
+    Molde de _state_from_json para una lista cuyos elementos siguen el molde
+    `item` (y, si se indica, de largo fijo); `factory` construye el resultado.
+    """
+
+    def __init__(self, item, length=None, factory=list):
+        self.item = item
+        self.length = length
+        self.factory = factory
+
+
+class _Mapping:
+    """Molde de _state_from_json para un dict de claves libres y valores `item`."""
+
+    def __init__(self, item):
+        self.item = item
+
+
+class _Optional:
+    """Molde de _state_from_json para un valor que puede ser null."""
+
+    def __init__(self, item):
+        self.item = item
+
+
+def _state_from_json(template, value):
+    """
+    Reconstruye un valor serializado con _state_to_json tomando como molde el
+    valor equivalente de un acumulador recién creado (mismos tipos y
+    default_factory) o un molde de MetricAccumulator._state_schema. El estado
+    puede venir del navegador: se validan tipos, largos y claves.
+    """
+
+    def expect(types):
+        if not isinstance(value, types) or isinstance(value, bool):
+            raise ValueError("Estado de análisis inválido")
+
+    if isinstance(template, _Optional):
+        if value is None:
+            return None
+        return _state_from_json(template.item, value)
+    if isinstance(template, _Items):
+        expect(list)
+        if template.length is not None and len(value) != template.length:
+            raise ValueError("Estado de análisis inválido")
+        return template.factory(_state_from_json(template.item, v) for v in value)
+    if isinstance(template, _Mapping):
+        expect(dict)
+        return {k: _state_from_json(template.item, v) for k, v in value.items()}
+    if isinstance(template, tuple):
+        # Lista de largo fijo con un molde por posición
+        expect(list)
+        if len(value) != len(template):
+            raise ValueError("Estado de análisis inválido")
+        return [_state_from_json(t, v) for t, v in zip(template, value)]
+    if isinstance(template, defaultdict):
+        expect(dict)
+        factory = template.default_factory
+        return defaultdict(
+            factory, {k: _state_from_json(factory(), v) for k, v in value.items()}
+        )
+    if isinstance(template, Counter):
+        expect(dict)
+        return Counter({k: _state_from_json(0, v) for k, v in value.items()})
+    if isinstance(template, dict):
+        expect(dict)
+        if not value.keys() <= template.keys():
+            raise ValueError("Estado de análisis inválido")
+        return {k: _state_from_json(template[k], v) for k, v in value.items()}
+    if isinstance(template, (set, list)):
+        raise TypeError(f"Falta el molde de los elementos de {template!r}")
+    if template is None:
+        if value is not None:
+            raise ValueError("Estado de análisis inválido")
+        return None
+    if isinstance(template, float):
+        expect((int, float))
     else:
-        racha_dias = 0
-
-    # Formatear fechas al formato dd-mm-yyyy para lapso y racha
-    # Calcular días totales de conversación
-    total_dias = (
-        (fin_global.date() - inicio_global.date()).days
-        if (inicio_global and fin_global)
-        else 0
-    )
+        expect(type(template))
+    return value
 
-    lapso_tiempo = {
-        "inicio": inicio_global.strftime("%d-%m-%Y") if inicio_global else None,
-        "fin": fin_global.strftime("%d-%m-%Y") if fin_global else None,
-        "duracion": str(lapso) if lapso else None,
-        "total_dias": total_dias,
-    }
-    racha_conversacional = {
-        "duracion_dias": racha_dias,
-        "inicio": streak_start.strftime("%d-%m-%Y") if streak_start else None,
-        "fin": streak_end.strftime("%d-%m-%Y") if streak_end else None,
+
+class MetricAccumulator:
+    """
+    Acumulador de una familia de métricas. analyze_messages llama a `feed`
+    con cada mensaje (en orden cronológico) y al final a `finalize`, que
+    agrega sus claves al dict de estadísticas (y, si corresponde, a
+    stats["nlp_info"]).
+
+    `merge` incorpora el estado de otro acumulador de la misma familia que
+    procesó el tramo de mensajes inmediatamente posterior. La operación es
+    asociativa y el resultado es el mismo que alimentar ambos tramos en una
+    sola pasada (incluido el orden de las claves, que define los desempates).
+    """
+
+    name = None
+
+    # Versión vectorizada de `feed` para un tramo completo (ordenado) de
+    # mensajes: feed_columns(timestamps, sender_ids, senders) con arrays de
+    # NumPy (ver MessageTable.numpy_columns). Las familias que sólo usan
+    # fecha y remitente la definen; AnalysisState.feed la usa si NumPy está
+    # instalado, con el mismo resultado que el loop por mensaje. Sin NumPy su
+    # `feed` puede recibir mensajes sin texto (msg.text es None).
+    feed_columns = None
+
+    # Atributos que no forman parte del estado (modelos, configuración); se
+    # recrean con __init__ al deserializar.
+    _transient = ()
+
+    # Moldes de _state_from_json para los atributos cuyo valor inicial no
+    # describe el estado (listas, sets, dicts sin claves fijas, valores que
+    # empiezan en None). El resto se valida contra el valor inicial.
+    _state_schema = {}
+
+    def feed(self, msg):
+        raise NotImplementedError
+
+    def merge(self, other):
+        raise NotImplementedError
+
+    def finalize(self, stats):
+        raise NotImplementedError
+
+    def __getstate__(self):
+        return {k: v for k, v in vars(self).items() if k not in self._transient}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.__dict__.update(state)
+
+    def to_dict(self):
+        """Estado serializable a JSON (ver AnalysisState.to_dict)."""
+        return _state_to_json(self.__getstate__())
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict):
+            raise ValueError("Estado de análisis inválido")
+        acc = cls()
+        for key, value in data.items():
+            if key not in vars(acc) or key in cls._transient:
+                raise ValueError("Estado de análisis inválido")
+            template = cls._state_schema.get(key, getattr(acc, key))
+            setattr(acc, key, _state_from_json(template, value))
+        return acc
+
+
+class ActivityAccumulator(MetricAccumulator):
+    """Participantes, histogramas por día/hora/día de semana, lapso y racha."""
+
+    name = "activity"
+    _state_schema = {
+        "mensajes_por_hora": _Items(0, length=24),
+        "dias": _Items(0, factory=set),
+        "first_ts": _Optional(0),
+        "last_ts": _Optional(0),
     }
 
-    # Armado final de estadísticas agrupado por categorías
-    stats_final = {
-        # Estadísticas generales
-        "total_mensajes": stats["total_mensajes"],
-        "participantes": list(participantes),
-        "mensajes_por_persona": dict(mensajes_por_persona),
-        "persona_mas_activa": {
+    def __init__(self):
+        self.mensajes_por_persona = defaultdict(int)
+        self.mensajes_por_dia = defaultdict(int)
+        self.mensajes_por_hora = [0] * 24  # Contaremos por hora (0-23)
+        self.mensajes_por_dia_semana = defaultdict(int)
+        self.dias = set()
+        self.first_ts = None
+        self.last_ts = None
+
+    def feed(self, msg):
+        self.mensajes_por_dia[msg.day] += 1
+        self.mensajes_por_hora[msg.hour] += 1
+        self.mensajes_por_dia_semana[DIAS_SEMANA[msg.weekday]] += 1
+        self.dias.add(msg.day_index)
+        if msg.sender is not None:
+            self.mensajes_por_persona[msg.sender] += 1
+        if self.first_ts is None or msg.timestamp < self.first_ts:
+            self.first_ts = msg.timestamp
+        if self.last_ts is None or msg.timestamp > self.last_ts:
+            self.last_ts = msg.timestamp
+
+    def feed_columns(self, timestamps, sender_ids, senders):
+        if not len(timestamps):
+            return
+        # El tramo está ordenado: cada día es una corrida de mensajes
+        days = timestamps // 86400
+        inicios = np.concatenate(([0], np.flatnonzero(np.diff(days)) + 1))
+        cantidades = np.diff(np.append(inicios, len(days)))
+        for day_index, count in zip(days[inicios].tolist(), cantidades.tolist()):
+            day = date.fromordinal(_EPOCH_ORDINAL + day_index).isoformat()
+            self.mensajes_por_dia[day] += count
+            weekday = (day_index + _EPOCH_WEEKDAY) % 7
+            self.mensajes_por_dia_semana[DIAS_SEMANA[weekday]] += count
+            self.dias.add(day_index)
+        horas = np.bincount(timestamps // 3600 % 24, minlength=24)
+        for hora, count in enumerate(horas.tolist()):
+            self.mensajes_por_hora[hora] += count
+        for sender_id, count in _first_seen_counts(sender_ids[sender_ids >= 0]):
+            self.mensajes_por_persona[senders[sender_id]] += count
+        first_ts, last_ts = int(timestamps[0]), int(timestamps[-1])
+        if self.first_ts is None or first_ts < self.first_ts:
+            self.first_ts = first_ts
+        if self.last_ts is None or last_ts > self.last_ts:
+            self.last_ts = last_ts
+
+    def merge(self, other):
+        _merge_counts(self.mensajes_por_persona, other.mensajes_por_persona)
+        _merge_counts(self.mensajes_por_dia, other.mensajes_por_dia)
+        for hora, count in enumerate(other.mensajes_por_hora):
+            self.mensajes_por_hora[hora] += count
+        _merge_counts(self.mensajes_por_dia_semana, other.mensajes_por_dia_semana)
+        # La racha se calcula sobre el conjunto de días, que ya cruza tramos
+        self.dias |= other.dias
+        if other.first_ts is not None:
+            if self.first_ts is None or other.first_ts < self.first_ts:
+                self.first_ts = other.first_ts
+            if self.last_ts is None or other.last_ts > self.last_ts:
+                self.last_ts = other.last_ts
+        return self
+
+    def finalize(self, stats):
+        total_messages = stats["total_mensajes"]
+        mensajes_por_persona = self.mensajes_por_persona
+        mensajes_por_dia_semana = self.mensajes_por_dia_semana
+
+        # Aseguramos keys de "00" a "23" para mensajes por hora
+        mensajes_por_hora_formateado = {
+            f"{h:02d}": count for h, count in enumerate(self.mensajes_por_hora)
+        }
+
+        # Día de la semana y persona más activos
+        if mensajes_por_dia_semana:
+            dia_semana_mas_activo = max(
+                mensajes_por_dia_semana, key=mensajes_por_dia_semana.get
+            )
+            dia_semana_mas_activo_cant = mensajes_por_dia_semana[dia_semana_mas_activo]
+        else:
+            dia_semana_mas_activo = None
+            dia_semana_mas_activo_cant = 0
+
+        if mensajes_por_persona:
+            persona_mas_activa = max(mensajes_por_persona, key=mensajes_por_persona.get)
+            persona_mas_activa_cant = mensajes_por_persona[persona_mas_activa]
+        else:
+            persona_mas_activa = None
+            persona_mas_activa_cant = 0
+
+        # Lapso global
+        if self.first_ts is not None:
+            inicio_global = _from_epoch_seconds(self.first_ts)
+            fin_global = _from_epoch_seconds(self.last_ts)
+            lapso = fin_global - inicio_global
+        else:
+            inicio_global = fin_global = lapso = None
+
+        # Racha conversacional: días consecutivos (días desde 1970-01-01)
+        fechas = sorted(self.dias)
+        dias_activos = len(fechas)  # Días con al menos un mensaje
+
+        streak_start, streak_end = _longest_day_run(fechas)
+        if streak_start is not None and streak_end is not None:
+            racha_dias = (streak_end - streak_start) + 1
+            streak_start = date.fromordinal(_EPOCH_ORDINAL + streak_start)
+            streak_end = date.fromordinal(_EPOCH_ORDINAL + streak_end)
+        else:
+            racha_dias = 0
+
+        # Formatear fechas al formato dd-mm-yyyy para lapso y racha
+        # Calcular días totales de conversación
+        total_dias = (
+            (fin_global.date() - inicio_global.date()).days
+            if (inicio_global and fin_global)
+            else 0
+        )
+
+        stats["participantes"] = list(mensajes_por_persona)
+        stats["mensajes_por_persona"] = dict(mensajes_por_persona)
+        stats["persona_mas_activa"] = {
             "persona": persona_mas_activa,
             "cantidad": persona_mas_activa_cant,
-        },
-        # Actividad
-        "mensajes_por_dia": dict(mensajes_por_dia),
-        "mensajes_por_hora": mensajes_por_hora_formateado,
-        "dia_semana_mas_activo": {
+        }
+        stats["mensajes_por_dia"] = dict(self.mensajes_por_dia)
+        stats["mensajes_por_hora"] = mensajes_por_hora_formateado
+        stats["dia_semana_mas_activo"] = {
             "dia": dia_semana_mas_activo,
             "cantidad": dia_semana_mas_activo_cant,
-        },
-        "mensajes_promedio_por_dia": (
+        }
+        stats["mensajes_promedio_por_dia"] = (
             total_messages / ((fin_global.date() - inicio_global.date()).days + 1)
             if (inicio_global and fin_global)
             else 0
-        ),
-        "dias_activos": dias_activos,  # Días con al menos un mensaje
-        # Texto y Multimedia
-        "palabras_promedio_por_mensaje": palabras_promedio,
-        "palabras_promedio_por_persona": palabras_promedio_por_persona,
+        )
+        stats["dias_activos"] = dias_activos
+        stats["lapso_tiempo"] = {
+            "inicio": inicio_global.strftime("%d-%m-%Y") if inicio_global else None,
+            "fin": fin_global.strftime("%d-%m-%Y") if fin_global else None,
+            "duracion": str(lapso) if lapso else None,
+            "total_dias": total_dias,
+        }
+        stats["racha_conversacional"] = {
+            "duracion_dias": racha_dias,
+            "inicio": streak_start.strftime("%d-%m-%Y") if streak_start else None,
+            "fin": streak_end.strftime("%d-%m-%Y") if streak_end else None,
+        }
+
+
+class TextAccumulator(MetricAccumulator):
+    """Palabras (sin NLP), multimedia y links."""
+
+    name = "text"
+
+    def __init__(self):
+        self.total_messages = 0
+        self.total_palabras = 0
+        self.multimedia_count = 0
+        self.total_links = 0
+        self.palabras_counter_raw = Counter()
+        self.palabras_por_persona = defaultdict(int)  # Total de palabras por persona
+        self.mensajes_count_persona = defaultdict(int)  # Para calcular promedio
+
+    def feed(self, msg):
+        self.total_messages += 1
+        if msg.has_media:
+            self.multimedia_count += 1
+        tokens = msg.tokens
+        self.total_links += tokens.links
+
+        palabras = tokens.raw_words
+        palabras_en_msg = len(palabras)
+        self.total_palabras += palabras_en_msg
+        self.palabras_counter_raw.update(palabras)
+
+        # Contar palabras por persona
+        if msg.sender is not None:
+            self.palabras_por_persona[msg.sender] += palabras_en_msg
+            self.mensajes_count_persona[msg.sender] += 1
+
+    def merge(self, other):
+        self.total_messages += other.total_messages
+        self.total_palabras += other.total_palabras
+        self.multimedia_count += other.multimedia_count
+        self.total_links += other.total_links
+        self.palabras_counter_raw.update(other.palabras_counter_raw)
+        _merge_counts(self.palabras_por_persona, other.palabras_por_persona)
+        _merge_counts(self.mensajes_count_persona, other.mensajes_count_persona)
+        return self
+
+    def finalize(self, stats):
+        total_messages = self.total_messages
+        # Calcular promedio de palabras por mensaje por persona
+        palabras_promedio_por_persona = {}
+        for persona, count in self.mensajes_count_persona.items():
+            promedio = self.palabras_por_persona[persona] / count
+            palabras_promedio_por_persona[persona] = round(promedio, 1)
+
+        stats["palabras_promedio_por_mensaje"] = (
+            self.total_palabras / total_messages if total_messages > 0 else 0
+        )
+        stats["palabras_promedio_por_persona"] = palabras_promedio_por_persona
+        stats["palabras_mas_utilizadas_raw"] = self.palabras_counter_raw.most_common(10)
+        stats["total_multimedia"] = self.multimedia_count
+        stats["total_links"] = self.total_links
+        stats["nlp_info"]["words_processed_raw"] = sum(
+            self.palabras_counter_raw.values()
+        )
+
+
+class EmojiAccumulator(MetricAccumulator):
+    """Ranking de emojis global y por persona."""
+
+    name = "emojis"
+
+    def __init__(self):
+        self.total_emojis = 0
+        self.emojis_counter = Counter()
+        # Emojis por persona
+        self.emojis_por_persona = defaultdict(Counter)
+
+    def feed(self, msg):
+        emojis_en_msg = msg.tokens.emojis
+        if not emojis_en_msg:
+            return
+        self.total_emojis += len(emojis_en_msg)
+        self.emojis_counter.update(emojis_en_msg)
+        if msg.sender is not None:
+            self.emojis_por_persona[msg.sender].update(emojis_en_msg)
+
+    def merge(self, other):
+        self.total_emojis += other.total_emojis
+        self.emojis_counter.update(other.emojis_counter)
+        for persona, counter in other.emojis_por_persona.items():
+            self.emojis_por_persona[persona].update(counter)
+        return self
+
+    def finalize(self, stats):
+        stats["total_emojis"] = self.total_emojis
+        stats["emojis_mas_utilizados"] = self.emojis_counter.most_common(10)
+        stats["emojis_por_persona"] = {
+            persona: counter.most_common(10)
+            for persona, counter in self.emojis_por_persona.items()
+        }
+
+
+class WordsAccumulator(MetricAccumulator):
+    """Palabras más usadas tras stopwords + lematización (spaCy si está)."""
+
+    name = "words"
+    _transient = (
+        "stop_en",
+        "stop_es",
+        "has_model",
+        "use_spacy",
+        "lemma_mode",
+        "pending",
+        "in_flight",
+        "lemma_cache",
+    )
+    _state_schema = {"counters": _Mapping(Counter())}
+
+    def __init__(self, lemma_mode=None):
+        # --- NLP setup (done once; used during the main loop) ---
+        self.stop_en, self.stop_es = _stopword_sets()
+        self.lemma_mode = lemma_mode or SPACY_LEMMA_MODE
+        # Solo se verifica qué modelos hay: cada lote toma un pipeline del
+        # pool compartido (_spacy_models) y lo devuelve al terminar.
+        self.has_model = {lang: _spacy_models.available(lang) for lang in ("en", "es")}
+        self.use_spacy = any(self.has_model.values())
+        if self.use_spacy:
+            # Con spaCy los textos se lematizan por lotes de SPACY_BATCH_SIZE
+            # a medida que llegan, por idioma; cada idioma tiene su propio
+            # contador (primero "en", luego "es"). Con SPACY_N_PROCESS > 1 los
+            # lotes van a procesos aparte y sus conteos se suman en orden.
+            # En modo "fast" se guardan las palabras de cada mensaje.
+            self.pending = {"en": [], "es": []}
+            self.in_flight = {"en": deque(), "es": deque()}
+            self.counters = {"en": Counter(), "es": Counter()}
+        else:
+            self.pending = None
+            self.in_flight = None
+            self.counters = {"all": Counter()}
+        # Modo "fast": lemas por palabra, sólo durante este análisis
+        self.lemma_cache = {"en": {}, "es": {}}
+
+    def __getstate__(self):
+        # Los modelos no se serializan: se lematiza lo pendiente antes de
+        # enviar el estado a otro proceso y allí se vuelven a cargar.
+        self._consume_pending()
+        return super().__getstate__()
+
+    @classmethod
+    def from_dict(cls, data):
+        acc = super().from_dict(data)
+        # El estado pudo generarse con otros modelos de spaCy disponibles;
+        # finalize suma todos los contadores, así que basta con completarlos.
+        acc.counters = {key: Counter(counter) for key, counter in acc.counters.items()}
+        for key in ("en", "es") if acc.use_spacy else ("all",):
+            acc.counters.setdefault(key, Counter())
+        return acc
+
+    def feed(self, msg):
+        words = msg.tokens.words
+        lang = _detect_lang_fast(words, self.stop_en, self.stop_es)
+
+        # Lemma/stopword word frequencies
+        if self.pending is not None:
+            pending = self.pending[lang]
+            pending.append(words if self.lemma_mode == "fast" else msg.normalized)
+            if len(pending) >= SPACY_BATCH_SIZE:
+                self._submit(lang)
+        else:
+            # Fallback mode (no spaCy models): stopwords over the shared tokens
+            self._count_basic(words, lang, self.counters["all"])
+
+    def _count_basic(self, words, lang, counter):
+        primary, secondary = _lemma_stopwords(lang)
+        for w in words:
+            if len(w) < 2:
+                continue
+            if w.isdigit():
+                continue
+            if w in primary or w in secondary:
+                continue
+            counter[w] += 1
+
+    def _submit(self, lang):
+        texts = self.pending[lang]
+        self.pending[lang] = []
+        counter = self.counters[lang]
+        has_model = self.has_model[lang]
+        if self.lemma_mode == "fast":
+            if not has_model:
+                for words in texts:
+                    self._count_basic(words, lang, counter)
+                return
+            with _spacy_models.model(lang) as nlp:
+                lemmas = _fast_lemmas(nlp, lang, texts, self.lemma_cache[lang])
+            for words in texts:
+                for word in words:
+                    counter.update(lemmas[word])
+        elif not has_model:
+            # If one language model isn't available, fallback to basic tokenization.
+            for t in texts:
+                self._count_basic(tokenize(t).words, lang, counter)
+        elif SPACY_N_PROCESS > 1:
+            in_flight = self.in_flight[lang]
+            in_flight.append(_spacy_pool(lang).submit(_lemma_counts, lang, texts))
+            # Pocos lotes en vuelo: no se acumula el chat entero en memoria
+            while len(in_flight) > 2 * SPACY_N_PROCESS:
+                counter.update(in_flight.popleft().result())
+        else:
+            with _spacy_models.model(lang) as nlp:
+                _count_lemmas(nlp, texts, lang, counter)
+
+    def _consume_pending(self):
+        if self.pending is None:
+            return
+        for lang in ("en", "es"):
+            if self.pending[lang]:
+                self._submit(lang)
+            in_flight = self.in_flight[lang]
+            while in_flight:
+                self.counters[lang].update(in_flight.popleft().result())
+
+    def merge(self, other):
+        self._consume_pending()
+        other._consume_pending()
+        for key, counter in other.counters.items():
+            self.counters.setdefault(key, Counter()).update(counter)
+        return self
+
+    def finalize(self, stats):
+        # --- NLP: stopwords + lemmatization (spaCy if available) ---
+        self._consume_pending()
+        # Nothing left to lemmatize: don't keep the chat's words around
+        self.lemma_cache = {"en": {}, "es": {}}
+        counter = Counter()
+        for partial in self.counters.values():
+            counter.update(partial)
+
         # Keep both raw and NLP-cleaned variants. Frontend can prefer NLP.
-        "palabras_mas_utilizadas_raw": palabras_counter_raw.most_common(10),
-        "palabras_mas_utilizadas_nlp": palabras_counter_nlp.most_common(50),
+        stats["palabras_mas_utilizadas_nlp"] = counter.most_common(50)
         # Backward-compatible key (now returns NLP-cleaned words)
-        "palabras_mas_utilizadas": (
-            palabras_counter_nlp.most_common(10)
-            if palabras_counter_nlp
-            else palabras_counter_raw.most_common(10)
-        ),
-        "total_multimedia": multimedia_count,
-        "total_links": total_links,
-        # Sentiment
-        "sentimiento_por_persona": sentimiento_por_persona,
-        "sentimiento_por_dia": sentimiento_por_dia,
-        "sentimiento_global": sentimiento_global,
-        # Emojis
-        "total_emojis": total_emojis,
-        "emojis_mas_utilizados": emojis_counter.most_common(10),
-        "emojis_por_persona": {
-            persona: counter.most_common(10)
-            for persona, counter in emojis_por_persona.items()
-        },
-        # Conversaciones
-        "iniciadores_de_conversacion": {
+        stats["palabras_mas_utilizadas"] = (
+            counter.most_common(10)
+            if counter
+            else stats.get("palabras_mas_utilizadas_raw", [])
+        )
+        stats["nlp_info"].update(
+            {
+                "spacy_en_model": self.has_model["en"],
+                "spacy_es_model": self.has_model["es"],
+                "lemmatization_active": self.use_spacy,
+                "lemma_mode": self.lemma_mode if self.use_spacy else "none",
+                "stopwords_en_count": len(self.stop_en),
+                "stopwords_es_count": len(self.stop_es),
+                "words_processed_nlp": sum(counter.values()),
+            }
+        )
+
+
+class SentimentAccumulator(MetricAccumulator):
+    """Sentimiento VADER por persona, por día y global."""
+
+    name = "sentiment"
+    _transient = ("vader", "scores")
+    _state_schema = {"personas": _Mapping(None)}
+
+    def __init__(self):
+        self.vader = _get_vader()
+        # LRU texto normalizado -> compound (hasta SENTIMENT_CACHE_SIZE)
+        self.scores = OrderedDict()
+        self.cache_hits = 0
+        self.total_messages = 0
+        self.personas = {}  # Participantes, en orden de aparición
+        self.sent_sum_by_persona = defaultdict(float)
+        self.sent_count_by_persona = defaultdict(int)
+        self.sent_counts_by_persona = defaultdict(_sentiment_counts)
+        self.sent_sum_by_day = defaultdict(float)
+        self.sent_count_by_day = defaultdict(int)
+        self.sent_global_counts = _sentiment_counts()
+        self.sent_global_sum = 0.0
+        self.sent_global_n = 0
+
+    def feed(self, msg):
+        self.total_messages += 1
+        sender = msg.sender
+        if sender is not None:
+            self.personas[sender] = None
+
+        # Sentiment (VADER) in-stream
+        if self.vader is None or not sender:
+            return
+        text = msg.normalized.strip()
+        if not text:
+            return
+        compound = self._compound(text)
+        label = _sentiment_label(compound)
+
+        self.sent_sum_by_persona[sender] += compound
+        self.sent_count_by_persona[sender] += 1
+        self.sent_counts_by_persona[sender][label] += 1
+
+        day = msg.day
+        self.sent_sum_by_day[day] += compound
+        self.sent_count_by_day[day] += 1
+
+        self.sent_global_sum += compound
+        self.sent_global_n += 1
+        self.sent_global_counts[label] += 1
+
+    def _compound(self, text):
+        scores = self.scores
+        compound = scores.get(text)
+        if compound is not None:
+            scores.move_to_end(text)
+            self.cache_hits += 1
+            return compound
+        compound = float(self.vader.polarity_scores(text).get("compound", 0.0))
+        scores[text] = compound
+        if len(scores) > SENTIMENT_CACHE_SIZE:
+            scores.popitem(last=False)
+        return compound
+
+    def merge(self, other):
+        self.total_messages += other.total_messages
+        self.cache_hits += other.cache_hits
+        self.personas.update(other.personas)
+        _merge_counts(self.sent_sum_by_persona, other.sent_sum_by_persona)
+        _merge_counts(self.sent_count_by_persona, other.sent_count_by_persona)
+        for persona, counts in other.sent_counts_by_persona.items():
+            _merge_counts(self.sent_counts_by_persona[persona], counts)
+        _merge_counts(self.sent_sum_by_day, other.sent_sum_by_day)
+        _merge_counts(self.sent_count_by_day, other.sent_count_by_day)
+        _merge_counts(self.sent_global_counts, other.sent_global_counts)
+        self.sent_global_sum += other.sent_global_sum
+        self.sent_global_n += other.sent_global_n
+        return self
+
+    def finalize(self, stats):
+        sentimiento_por_persona = {}
+        for persona in self.personas:
+            n = self.sent_count_by_persona.get(persona, 0)
+            avg = (self.sent_sum_by_persona.get(persona, 0.0) / n) if n else 0.0
+            counts = self.sent_counts_by_persona.get(persona, _sentiment_counts())
+            sentimiento_por_persona[persona] = {
+                "promedio_compound": round(avg, 4),
+                "positive": int(counts.get("positive", 0)),
+                "neutral": int(counts.get("neutral", 0)),
+                "negative": int(counts.get("negative", 0)),
+                "total": int(n),
+            }
+
+        sentimiento_por_dia = {}
+        for day, n in self.sent_count_by_day.items():
+            if n:
+                sentimiento_por_dia[day] = round(self.sent_sum_by_day[day] / n, 4)
+
+        total_messages = self.total_messages
+        sent_global_n = self.sent_global_n
+        engine = "vader" if self.vader is not None else "disabled"
+        sentimiento_global = {
+            "promedio_compound": (
+                round((self.sent_global_sum / sent_global_n), 4)
+                if sent_global_n
+                else 0.0
+            ),
+            "positive": int(self.sent_global_counts["positive"]),
+            "neutral": int(self.sent_global_counts["neutral"]),
+            "negative": int(self.sent_global_counts["negative"]),
+            "total": int(sent_global_n),
+            "engine": engine,
+            "coverage": {
+                "scored_messages": int(sent_global_n),
+                "total_messages": int(total_messages),
+                "scored_pct": (
+                    round((sent_global_n / total_messages) * 100, 1)
+                    if total_messages
+                    else 0.0
+                ),
+            },
+        }
+
+        stats["sentimiento_por_persona"] = sentimiento_por_persona
+        stats["sentimiento_por_dia"] = sentimiento_por_dia
+        stats["sentimiento_global"] = sentimiento_global
+        stats["nlp_info"].update(
+            {
+                "sentiment_engine": engine,
+                "sentiment_available": self.vader is not None,
+                # Mensajes puntuados que reutilizaron el puntaje de un texto idéntico
+                "sentiment_cache_hits": self.cache_hits,
+                "sentiment_cache_hit_rate": (
+                    round(self.cache_hits / sent_global_n, 4) if sent_global_n else 0.0
+                ),
+            }
+        )
+
+
+# Gap máximo (segundos) entre mensajes de una misma conversación
+CONVERSATION_GAP_SECONDS = 7200
+
+
+class ConversationAccumulator(MetricAccumulator):
+    """Conversaciones (gap de 2 horas): iniciadores, duración y horas totales."""
+
+    name = "conversations"
+    _state_schema = {"abiertas": _Items((_Optional(""), 0, 0))}
+
+    def __init__(self):
+        # [iniciador, inicio, fin] de la primera y la última conversación del
+        # tramo: son las únicas que pueden unirse con los tramos vecinos.
+        self.abiertas = []
+        # Conversaciones intermedias ya cerradas (sólo las de duración > 0)
+        self.total_conversaciones = 0
+        self.duracion_total = 0
+        self.iniciadores = Counter()
+
+    def _close(self, conversacion):
+        iniciador, inicio, fin = conversacion
+        if fin > inicio:
+            self.total_conversaciones += 1
+            self.duracion_total += fin - inicio
+            if iniciador:
+                self.iniciadores[iniciador] += 1
+
+    def feed(self, msg):
+        ts = msg.timestamp
+        abiertas = self.abiertas
+        if abiertas and (ts - abiertas[-1][2]) < CONVERSATION_GAP_SECONDS:
+            abiertas[-1][2] = ts
+            return
+        if len(abiertas) == 2:
+            self._close(abiertas.pop())
+        abiertas.append([msg.sender, ts, ts])
+
+    def feed_columns(self, timestamps, sender_ids, senders):
+        if not len(timestamps):
+            return
+        # Una conversación empieza en cada mensaje a 2 horas o más del anterior
+        inicios = np.concatenate(
+            ([0], np.flatnonzero(np.diff(timestamps) >= CONVERSATION_GAP_SECONDS) + 1)
+        )
+        fines = np.append(inicios[1:] - 1, len(timestamps) - 1)
+
+        def conversacion(k):
+            return [
+                _sender_name(senders, int(sender_ids[inicios[k]])),
+                int(timestamps[inicios[k]]),
+                int(timestamps[fines[k]]),
+            ]
+
+        tramo = ConversationAccumulator()
+        tramo.abiertas = [conversacion(0)]
+        if len(inicios) > 1:
+            tramo.abiertas.append(conversacion(len(inicios) - 1))
+            # Las intermedias se cierran acá (sólo las de duración > 0)
+            medio = slice(1, len(inicios) - 1)
+            duraciones = timestamps[fines[medio]] - timestamps[inicios[medio]]
+            cerradas = duraciones > 0
+            tramo.total_conversaciones = int(cerradas.sum())
+            tramo.duracion_total = int(duraciones[cerradas].sum())
+            iniciadores = sender_ids[inicios[medio]][cerradas]
+            iniciadores = iniciadores[_truthy_senders(iniciadores, senders)]
+            for sender_id, count in _first_seen_counts(iniciadores):
+                tramo.iniciadores[senders[sender_id]] = count
+        self.merge(tramo)
+
+    def merge(self, other):
+        siguientes = [list(conv) for conv in other.abiertas]
+        if not self.abiertas:
+            self.abiertas = siguientes
+        elif siguientes:
+            ultima = self.abiertas[-1]
+            if (siguientes[0][1] - ultima[2]) < CONVERSATION_GAP_SECONDS:
+                # La conversación abierta continúa en el tramo siguiente
+                ultima[2] = siguientes.pop(0)[2]
+            if siguientes:
+                # Se cierran, en orden, las que quedan entre la primera de
+                # self y la última de other.
+                if len(self.abiertas) == 2:
+                    self._close(ultima)
+                for conv in siguientes[:-1]:
+                    self._close(conv)
+                self.abiertas = [self.abiertas[0], siguientes[-1]]
+        self.total_conversaciones += other.total_conversaciones
+        self.duracion_total += other.duracion_total
+        self.iniciadores.update(other.iniciadores)
+        return self
+
+    def finalize(self, stats):
+        # Se cierran (en orden) la primera, las intermedias y la última;
+        # sólo cuentan las conversaciones con duración > 0.
+        resumen = ConversationAccumulator()
+        if self.abiertas:
+            resumen._close(self.abiertas[0])
+        resumen.total_conversaciones += self.total_conversaciones
+        resumen.duracion_total += self.duracion_total
+        resumen.iniciadores.update(self.iniciadores)
+        if len(self.abiertas) == 2:
+            resumen._close(self.abiertas[1])
+        total_conversaciones = resumen.total_conversaciones
+        duracion_total = resumen.duracion_total
+        iniciadores = resumen.iniciadores
+
+        if total_conversaciones:
+            promedio_segundos = duracion_total / total_conversaciones
+            promedio_duracion = format_duration(timedelta(seconds=promedio_segundos))
+            # Calcular horas totales "desperdiciadas" chateando
+            total_horas_chat = duracion_total / 3600
+        else:
+            promedio_duracion = "0 min"
+            total_horas_chat = 0
+
+        # Iniciadores de conversaciones y porcentajes
+        iniciadores_porcentajes = {
+            persona: f"{(count / total_conversaciones * 100):.1f}%"
+            for persona, count in iniciadores.items()
+        }
+
+        stats["iniciadores_de_conversacion"] = {
             "iniciadores": dict(iniciadores),
             "porcentajes": iniciadores_porcentajes,
             "total_conversaciones": total_conversaciones,
-            "podio": podio_iniciadores,
-        },
-        "tiempo_promedio_conversacion": promedio_duracion,
-        "tiempo_respuesta_por_persona": promedio_respuesta_por_persona,
-        "horas_totales_chat": round(total_horas_chat, 1),
-        "lapso_tiempo": lapso_tiempo,
-        "racha_conversacional": racha_conversacional,
-        # NLP/Analysis metadata - informa qué funcionalidades están activas
-        "nlp_info": {
-            "spacy_available": spacy is not None,
-            "spacy_en_model": nlp_en is not None,
-            "spacy_es_model": nlp_es is not None,
-            "lemmatization_active": use_spacy,
-            "stopwords_en_count": len(stop_en),
-            "stopwords_es_count": len(stop_es),
-            "sentiment_engine": "vader" if vader is not None else "disabled",
-            "sentiment_available": vader is not None,
-            "words_processed_nlp": sum(palabras_counter_nlp.values()),
-            "words_processed_raw": sum(palabras_counter_raw.values()),
-        },
+            # Podio de iniciadores (ordenado de mayor a menor)
+            "podio": iniciadores.most_common(),
+        }
+        stats["tiempo_promedio_conversacion"] = promedio_duracion
+        stats["horas_totales_chat"] = round(total_horas_chat, 1)
+
+
+class ResponseTimeAccumulator(MetricAccumulator):
+    """Tiempo de respuesta promedio por persona."""
+
+    name = "response_times"
+    _state_schema = {
+        "respuestas": _Mapping((0, 0)),
+        "first_sender": _Optional(""),
+        "first_ts": _Optional(0),
+        "last_sender": _Optional(""),
+        "last_ts": _Optional(0),
     }
 
-    return stats_final
+    def __init__(self):
+        # persona -> [suma de segundos, cantidad de respuestas]
+        self.respuestas = {}
+        # Primer y último mensaje del tramo, para unir tramos consecutivos
+        self.first_sender = self.first_ts = None
+        self.last_sender = self.last_ts = None
+
+    def _add_response(self, prev_sender, prev_ts, sender, ts):
+        gap = ts - prev_ts
+        # Solo contar como respuesta si:
+        # 1. El gap es menor a 2 horas (misma conversación)
+        # 2. Es de una persona diferente (es una respuesta, no continuación)
+        # 3. El gap es mayor a 5 segundos (evitar mensajes muy seguidos)
+        if gap < CONVERSATION_GAP_SECONDS and gap > 5 and sender and prev_sender:
+            if sender != prev_sender:
+                acumulado = self.respuestas.get(sender)
+                if acumulado is None:
+                    self.respuestas[sender] = [gap, 1]
+                else:
+                    acumulado[0] += gap
+                    acumulado[1] += 1
+
+    def feed(self, msg):
+        sender = msg.sender
+        ts = msg.timestamp
+        if self.last_ts is None:
+            self.first_sender, self.first_ts = sender, ts
+        else:
+            self._add_response(self.last_sender, self.last_ts, sender, ts)
+        self.last_sender = sender
+        self.last_ts = ts
+
+    def feed_columns(self, timestamps, sender_ids, senders):
+        if not len(timestamps):
+            return
+        tramo = ResponseTimeAccumulator()
+        tramo.first_sender = _sender_name(senders, int(sender_ids[0]))
+        tramo.first_ts = int(timestamps[0])
+        tramo.last_sender = _sender_name(senders, int(sender_ids[-1]))
+        tramo.last_ts = int(timestamps[-1])
+
+        # Mismas condiciones que _add_response, para todos los pares a la vez
+        gaps = np.diff(timestamps)
+        con_remitente = _truthy_senders(sender_ids, senders)
+        respuesta = (
+            (gaps < CONVERSATION_GAP_SECONDS)
+            & (gaps > 5)
+            & con_remitente[1:]
+            & con_remitente[:-1]
+            & (sender_ids[1:] != sender_ids[:-1])
+        )
+        respondedores = sender_ids[1:][respuesta]
+        # Los gaps son enteros chicos: la suma en float64 es exacta
+        totales = np.bincount(respondedores, weights=gaps[respuesta])
+        for sender_id, count in _first_seen_counts(respondedores):
+            tramo.respuestas[senders[sender_id]] = [int(totales[sender_id]), count]
+        self.merge(tramo)
+
+    def merge(self, other):
+        if other.first_ts is None:
+            return self
+        if self.last_ts is None:
+            self.first_sender, self.first_ts = other.first_sender, other.first_ts
+        else:
+            # Respuesta que cruza el límite entre los dos tramos
+            self._add_response(
+                self.last_sender, self.last_ts, other.first_sender, other.first_ts
+            )
+        for persona, (total, cantidad) in other.respuestas.items():
+            acumulado = self.respuestas.setdefault(persona, [0, 0])
+            acumulado[0] += total
+            acumulado[1] += cantidad
+        self.last_sender, self.last_ts = other.last_sender, other.last_ts
+        return self
+
+    def finalize(self, stats):
+        # Calcular promedio de tiempo de respuesta por persona
+        promedio_respuesta_por_persona = {}
+        for persona, (total, cantidad) in self.respuestas.items():
+            promedio_seg = total / cantidad
+            promedio_respuesta_por_persona[persona] = {
+                "promedio_segundos": promedio_seg,
+                "promedio_formateado": format_duration(
+                    timedelta(seconds=promedio_seg)
+                ),
+                "total_respuestas": cantidad,
+            }
+        stats["tiempo_respuesta_por_persona"] = promedio_respuesta_por_persona
+
+
+# Familias de métricas disponibles para analyze_messages(metrics=...), en el
+# orden en que se finalizan ("words" usa el resultado de "text" como respaldo).
+METRIC_FAMILIES = {
+    acc.name: acc
+    for acc in (
+        ActivityAccumulator,
+        TextAccumulator,
+        EmojiAccumulator,
+        WordsAccumulator,
+        SentimentAccumulator,
+        ConversationAccumulator,
+        ResponseTimeAccumulator,
+    )
+}
+
+
+# Familias baratas (conteos y regex) y las de NLP, que dominan el tiempo de
+# análisis; sirven para publicar resultados parciales en ese orden.
+FAST_METRICS = ("activity", "text", "emojis", "conversations", "response_times")
+NLP_METRICS = ("words", "sentiment")
+
+
+def _metric_names(metrics):
+    if metrics is None:
+        return list(METRIC_FAMILIES)
+    unknown = set(metrics) - set(METRIC_FAMILIES)
+    if unknown:
+        raise ValueError(
+            f"Métricas desconocidas: {', '.join(sorted(unknown))}. "
+            f"Disponibles: {', '.join(METRIC_FAMILIES)}"
+        )
+    return [name for name in METRIC_FAMILIES if name in metrics]
+
+
+def _base_nlp_info():
+    return {
+        "spacy_available": _spacy_installed(),
+        "spacy_en_model": False,
+        "spacy_es_model": False,
+        "lemmatization_active": False,
+        "lemma_mode": "none",
+        "stopwords_en_count": 0,
+        "stopwords_es_count": 0,
+        "sentiment_engine": "disabled",
+        "sentiment_available": False,
+        "sentiment_cache_hits": 0,
+        "sentiment_cache_hit_rate": 0.0,
+        "words_processed_nlp": 0,
+        "words_processed_raw": 0,
+    }
+
+
+def message_fingerprint(sender, text):
+    """Huella corta de un mensaje, para reconocerlo en un export posterior."""
+    data = f"{sender or ''}\x00{text}".encode("utf-8", errors="replace")
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def _feed_rows(messages, accumulators, progress=None, texts=True):
+    """
+    Alimenta `accumulators` mensaje por mensaje, en orden. Con texts=False el
+    MessageContext no lleva el texto (para familias que sólo usan fecha y
+    remitente) y no se decodifica.
+    """
+    feeders = [acc.feed for acc in accumulators]
+    if not feeders:
+        return
+    timestamps = messages.timestamps
+    text = messages.text if texts else lambda i: None
+    total = len(messages)
+    msg = MessageContext()
+    for i in range(total):
+        if progress is not None and i % PROGRESS_EVERY_MESSAGES == 0:
+            progress(i / total)
+        msg.reset(timestamps[i], messages.sender(i), text(i))
+        for feed in feeders:
+            feed(msg)
+
+
+class AnalysisState:
+    """
+    Estado intermedio de analyze_messages sobre un tramo contiguo (en el
+    tiempo) de mensajes.
+
+    Los estados de tramos consecutivos se combinan con `merge` (asociativo:
+    a.merge(b).merge(c) equivale a a.merge(b.merge(c))), y `finalize` produce
+    el mismo dict que analyze_messages sobre todos los mensajes juntos. Se
+    puede serializar con pickle para enviarlo entre procesos, o con
+    to_dict/from_dict (JSON) para guardarlo y continuar el análisis con un
+    export más nuevo del mismo chat (ver `update`).
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = _metric_names(metrics)
+        self.total_messages = 0
+        self.accumulators = [METRIC_FAMILIES[name]() for name in self.metrics]
+        # Último instante analizado (segundos desde 1970) y huellas de los
+        # mensajes en ese instante, para encontrar el solapamiento con un
+        # export posterior.
+        self.last_timestamp = None
+        self.last_fingerprints = []
+
+    @classmethod
+    def from_messages(cls, messages, metrics=None, progress=None):
+        """Construye el estado de un tramo (MessageTable o lista de dicts)."""
+        state = cls(metrics)
+        state.feed(messages, progress=progress)
+        return state
+
+    def feed(self, messages, progress=None, partial=None):
+        """
+        Procesa mensajes posteriores a los ya procesados. `progress`, si se
+        pasa, se llama con la fracción procesada (0.0 a 1.0) cada
+        PROGRESS_EVERY_MESSAGES mensajes.
+
+        Las familias que sólo usan fecha y remitente (las que definen
+        feed_columns) se procesan antes que las que recorren el texto de cada
+        mensaje. `partial`, si se pasa, se llama con los nombres de esas
+        familias apenas terminan, para mostrar sus estadísticas (ver
+        finalize) mientras las demás siguen.
+        """
+        # Acepta tanto una MessageTable como la antigua lista de dicts.
+        if not isinstance(messages, MessageTable):
+            messages = MessageTable.from_dicts(messages)
+
+        # Ordenar mensajes por fecha para segmentar adecuadamente las
+        # conversaciones (una tabla ya ordenada se usa sin copiar)
+        messages = messages.sorted_by_time()
+        timestamps = messages.timestamps
+
+        total = len(messages)
+        by_columns = [acc for acc in self.accumulators if acc.feed_columns is not None]
+        by_rows = [acc for acc in self.accumulators if acc.feed_columns is None]
+        if _load_numpy() is not None:
+            if total:
+                columns = messages.numpy_columns()
+                for acc in by_columns:
+                    acc.feed_columns(*columns, messages.senders)
+        elif partial is not None and by_rows:
+            # Sin NumPy, un loop propio que no decodifica los textos
+            _feed_rows(messages, by_columns, texts=False)
+        else:
+            by_columns, by_rows = [], self.accumulators
+
+        self.total_messages += total
+        if partial is not None and by_columns and by_rows:
+            partial([acc.name for acc in by_columns])
+        _feed_rows(messages, by_rows, progress)
+        if progress is not None:
+            progress(1.0)
+
+        if timestamps:
+            last = timestamps[-1]
+            first_at_last = bisect.bisect_left(timestamps, last)
+            self._advance_last(
+                last,
+                [
+                    message_fingerprint(messages.sender(i), messages.text(i))
+                    for i in range(first_at_last, len(messages))
+                ],
+            )
+
+    def _advance_last(self, timestamp, fingerprints):
+        if self.last_timestamp is None or timestamp > self.last_timestamp:
+            self.last_timestamp = timestamp
+            self.last_fingerprints = list(fingerprints)
+        elif timestamp == self.last_timestamp:
+            self.last_fingerprints.extend(fingerprints)
+
+    def update(self, messages, progress=None):
+        """
+        Incorpora un export más nuevo del mismo chat procesando sólo los
+        mensajes posteriores a los ya analizados. El solapamiento se detecta
+        por el último instante analizado y las huellas de sus mensajes; si el
+        export no contiene esos mensajes (otro chat, o un export más viejo)
+        se lanza ValueError. Retorna la cantidad de mensajes nuevos.
+        """
+        if self.last_timestamp is None:
+            self.feed(messages, progress=progress)
+            return self.total_messages
+
+        if not isinstance(messages, MessageTable):
+            messages = MessageTable.from_dicts(messages)
+        messages = messages.sorted_by_time()
+        timestamps = messages.timestamps
+        start = bisect.bisect_left(timestamps, self.last_timestamp)
+        end = bisect.bisect_right(timestamps, self.last_timestamp)
+
+        pending = Counter(self.last_fingerprints)
+        nuevos = []  # Mensajes del último instante que no estaban analizados
+        for i in range(start, end):
+            fingerprint = message_fingerprint(messages.sender(i), messages.text(i))
+            if pending[fingerprint] > 0:
+                pending[fingerprint] -= 1
+            else:
+                nuevos.append(i)
+        if len(nuevos) == end - start:
+            raise ValueError(
+                "El export no contiene los últimos mensajes del análisis previo"
+            )
+
+        tail = messages.take(chain(nuevos, range(end, len(messages))))
+        self.feed(tail, progress=progress)
+        return len(tail)
+
+    def merge(self, other):
+        """Incorpora el estado del tramo inmediatamente posterior."""
+        if other.metrics != self.metrics:
+            raise ValueError("Sólo se pueden combinar estados con las mismas métricas")
+        for acc, other_acc in zip(self.accumulators, other.accumulators):
+            acc.merge(other_acc)
+        self.total_messages += other.total_messages
+        if other.last_timestamp is not None:
+            self._advance_last(other.last_timestamp, other.last_fingerprints)
+        return self
+
+    def include(self, other):
+        """
+        Agrega las familias de métricas de `other`, calculadas sobre los mismos
+        mensajes (p. ej. primero FAST_METRICS y después NLP_METRICS).
+        """
+        if set(self.metrics) & set(other.metrics):
+            raise ValueError("Los estados tienen familias de métricas en común")
+        if (self.total_messages, self.last_timestamp) != (
+            other.total_messages,
+            other.last_timestamp,
+        ):
+            raise ValueError("Los estados no corresponden a los mismos mensajes")
+        accumulators = {acc.name: acc for acc in self.accumulators + other.accumulators}
+        self.metrics = [name for name in METRIC_FAMILIES if name in accumulators]
+        self.accumulators = [accumulators[name] for name in self.metrics]
+        return self
+
+    def finalize(self, metrics=None):
+        """
+        Retorna el dict de estadísticas (ver analyze_messages); con `metrics`,
+        sólo el de esas familias (p. ej. las que ya terminó `feed`).
+        """
+        stats = {"total_mensajes": self.total_messages, "nlp_info": _base_nlp_info()}
+        for acc in self.accumulators:
+            if metrics is None or acc.name in metrics:
+                acc.finalize(stats)
+
+        # Armado final de estadísticas agrupado por categorías
+        return {key: stats[key] for key in STATS_KEYS if key in stats}
+
+    def to_dict(self):
+        """Serializa el estado a tipos JSON (ver from_dict)."""
+        return {
+            "version": ANALYSIS_STATE_VERSION,
+            "metrics": self.metrics,
+            "total_messages": self.total_messages,
+            "last_timestamp": self.last_timestamp,
+            "last_fingerprints": self.last_fingerprints,
+            "accumulators": {acc.name: acc.to_dict() for acc in self.accumulators},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstruye un estado de to_dict; lanza ValueError si es inválido."""
+        try:
+            if data.get("version") != ANALYSIS_STATE_VERSION:
+                raise ValueError("Versión de estado de análisis no soportada")
+            state = cls(data["metrics"])
+            state.total_messages = _state_from_json(0, data["total_messages"])
+            state.last_timestamp = _state_from_json(
+                _Optional(0), data["last_timestamp"]
+            )
+            state.last_fingerprints = _state_from_json(
+                _Items(""), data["last_fingerprints"]
+            )
+            accumulators = data["accumulators"]
+            state.accumulators = [
+                METRIC_FAMILIES[name].from_dict(accumulators[name])
+                for name in state.metrics
+            ]
+        except (AttributeError, KeyError, TypeError) as e:
+            raise ValueError("Estado de análisis inválido") from e
+        return state
+
+
+def _analyze_parallel(messages, metrics, workers, progress=None):
+    """Analiza tramos contiguos en `workers` procesos y combina los estados."""
+    if not isinstance(messages, MessageTable):
+        messages = MessageTable.from_dicts(messages)
+    messages = messages.sorted_by_time()
+    total = len(messages)
+    bounds = [total * i // workers for i in range(workers + 1)]
+    parts = [messages.take(range(a, b)) for a, b in zip(bounds, bounds[1:])]
+
+    states = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for part_state in executor.map(
+            AnalysisState.from_messages, parts, repeat(metrics)
+        ):
+            states.append(part_state)
+            if progress is not None:
+                progress(len(states) / len(parts))
+    state = states[0]
+    for other in states[1:]:
+        state.merge(other)
+    return state
+
+
+def build_analysis_state(
+    messages,
+    metrics=None,
+    workers=1,
+    parallel_min_messages=PARALLEL_ANALYZE_MIN_MESSAGES,
+    progress=None,
+):
+    """
+    Construye el AnalysisState de todos los mensajes (ver analyze_messages).
 
+    Con `workers` > 1 y al menos `parallel_min_messages` mensajes, el chat se
+    divide en tramos que se analizan en procesos separados y se combinan con
+    AnalysisState.merge; el resultado es idéntico. Es opcional: por defecto se
+    analiza en el mismo proceso, que es lo que conviene dentro de un servidor
+    con hilos (no se lanzan procesos por cada subida).
 
-def process_chat(input_file, output_file):
+    `progress` recibe la fracción analizada (ver AnalysisState.feed); en modo
+    multiproceso avanza a medida que termina cada tramo.
+    """
+    metrics = _metric_names(metrics)
+    if workers > 1 and len(messages) >= max(parallel_min_messages, workers):
+        return _analyze_parallel(messages, metrics, workers, progress)
+    return AnalysisState.from_messages(messages, metrics, progress)
+
+
+def analyze_messages(
+    messages,
+    metrics=None,
+    workers=1,
+    parallel_min_messages=PARALLEL_ANALYZE_MIN_MESSAGES,
+):
+    """
+    A partir de la lista de mensajes filtrados, calcula las estadísticas:
+      - Estadísticas generales: total de mensajes, participantes, mensajes por persona.
+      - Actividad: mensajes por día, por hora (de 00 a 23), por día de la semana,
+                   y la hora, día y persona más activos.
+      - Texto y Multimedia: palabras promedio por mensaje, palabras más utilizadas,
+                            total de multimedia y links.
+      - Emojis: total de emojis, ranking de emojis global y por persona (solo top 10).
+      - Conversaciones: iniciadores y tiempo promedio de conversación (segmentadas con gap de 2 horas).
+      - Racha conversacional más larga (días consecutivos) con inicio y fin.
+
+    Cada familia de métricas es un acumulador (ver METRIC_FAMILIES) y todos se
+    alimentan en una sola pasada sobre los mensajes. `metrics` permite pedir
+    sólo algunas familias, p. ej. metrics={"activity", "emojis"}; así no se
+    paga el costo de NLP/sentimiento si no se necesita. Por defecto se
+    calculan todas.
+
+    Con `workers` > 1 los chats grandes se reparten entre procesos (ver
+    build_analysis_state).
+    Los mensajes se ordenan por fecha sólo si hace falta: una MessageTable en
+    orden cronológico (lo habitual al parsear un export, o el resultado de
+    MessageTable.sorted_by_time) se analiza sin copiarla.
+    """
+    return build_analysis_state(
+        messages, metrics, workers, parallel_min_messages
+    ).finalize()
+
+
+def compare_lemma_modes(messages, top=50):
+    """
+    Compara las palabras más usadas (top `top`) del modo de lematización
+    "fast" contra el pipeline completo de spaCy sobre los mismos mensajes.
+
+    Retorna un dict con:
+      - lemmatization_active: si había algún modelo de spaCy (si no, ambos
+        modos cuentan lo mismo).
+      - coincidencia: fracción de palabras del top del pipeline que también
+        están en el top del modo fast.
+      - solo_pipeline / solo_fast: palabras que aparecen en un solo top.
+      - diferencias: palabra -> [conteo pipeline, conteo fast] para las
+        palabras de ambos tops con distinto conteo.
+    """
+    if not isinstance(messages, MessageTable):
+        messages = MessageTable.from_dicts(messages)
+    messages = messages.sorted_by_time()
+    pipeline = WordsAccumulator(lemma_mode="pipeline")
+    fast = WordsAccumulator(lemma_mode="fast")
+    msg = MessageContext()
+    for i in range(len(messages)):
+        msg.reset(messages.timestamps[i], messages.sender(i), messages.text(i))
+        pipeline.feed(msg)
+        fast.feed(msg)
+
+    tops = []
+    for acc in (pipeline, fast):
+        acc._consume_pending()
+        counter = Counter()
+        for partial in acc.counters.values():
+            counter.update(partial)
+        tops.append(dict(counter.most_common(top)))
+    top_pipeline, top_fast = tops
+    return {
+        "lemmatization_active": pipeline.use_spacy,
+        "top": top,
+        "coincidencia": (
+            round(len(top_pipeline.keys() & top_fast.keys()) / len(top_pipeline), 4)
+            if top_pipeline
+            else 1.0
+        ),
+        "solo_pipeline": [w for w in top_pipeline if w not in top_fast],
+        "solo_fast": [w for w in top_fast if w not in top_pipeline],
+        "diferencias": {
+            w: [count, top_fast[w]]
+            for w, count in top_pipeline.items()
+            if w in top_fast and top_fast[w] != count
+        },
+    }
+
+
+def process_chat(
+    input_file, output_file, use_mmap=False, state_file=None, workers=None
+):
     """
     Procesa el chat exportado de WhatsApp (archivo .txt) y exporta las estadísticas en formato JSON.
 
     Parámetros:
-      input_file: ruta al archivo de chat.
+      input_file: ruta al archivo de chat (.txt, o el export .zip / .gz).
       output_file: ruta de salida para el JSON resultante.
+      use_mmap: parsear mapeando el archivo en memoria (útil en lotes sobre disco local).
+      state_file: ruta a un estado de análisis (JSON). Si existe, sólo se
+                  analizan los mensajes nuevos del export respecto de ese
+                  estado; en ambos casos se guarda el estado actualizado.
+      workers: procesos para parsear y analizar archivos grandes (None = uno
+               por CPU: desde la línea de comandos el proceso es sólo del
+               análisis).
     """
-    messages = parse_chat(input_file)
-    stats = analyze_messages(messages)
+    workers = workers or os.cpu_count() or 1
+    state = None
+    if state_file and os.path.exists(state_file):
+        with open(state_file, encoding="utf-8") as f:
+            state = AnalysisState.from_dict(json.load(f))
+
+    since = (
+        _from_epoch_seconds(state.last_timestamp)
+        if state is not None and state.last_timestamp is not None
+        else None
+    )
+    if input_file.lower().endswith((".zip", ".gz")):
+        with open(input_file, "rb") as f:
+            messages = parse_chat_export(f, input_file)
+    else:
+        messages = parse_chat(
+            input_file, workers=workers, use_mmap=use_mmap, since=since
+        )
+
+    if state is None:
+        state = build_analysis_state(messages, workers=workers)
+    else:
+        state.update(messages)
+    stats = state.finalize()
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(stats, f, ensure_ascii=False, indent=4)
     print(f"Estadísticas exportadas a {output_file}")
+    if state_file:
+        with open(state_file, "w", encoding="utf-8") as f:
+            json.dump(state.to_dict(), f, ensure_ascii=False)